@@ -1,6 +1,9 @@
 import sqlite3
 import os
 
+# The shared SQLite connection factory (async_decorators finds it)
+from async_decorators import sqlite_profiles
+
 # --- 1. The Class-Based Context Manager ---
 
 
@@ -21,7 +24,7 @@ class DatabaseConnection:
         """Opens the database connection when entering the 'with' block."""
         print(f"--> Entering context: Connecting to {self.db_name}...")
         try:
-            self.connection = sqlite3.connect(self.db_name)
+            self.connection = sqlite_profiles.connect(self.db_name)
             print("    Connection successful.")
             return self.connection
         except sqlite3.Error as e:
@@ -73,6 +76,8 @@ def setup_database(db_name="my_app.db"):
 
     conn.commit()
     conn.close()
+    # The journal mode is stored in the file, so it is set once here
+    sqlite_profiles.prepare_database(db_name)
     print("--- Database setup complete ---\n")
 
 
@@ -112,5 +117,5 @@ if __name__ == "__main__":
 
     # Clean up the created database file
     if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
+        sqlite_profiles.remove_database(DB_FILE)
         print(f"\nCleaned up and removed '{DB_FILE}'.")
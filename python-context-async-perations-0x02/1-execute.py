@@ -1,14 +1,16 @@
 import sqlite3
 import os
 
+# The shared SQLite connection factory (async_decorators finds it)
+from async_decorators import sqlite_profiles
+
 # --- 1. A Helper Function to Set Up a Dummy Database ---
 
 
 def setup_database(db_name="users_with_age.db"):
     """Creates a database with a 'users' table including an 'age' column."""
     print("--- Setting up the database for the demo ---")
-    if os.path.exists(db_name):
-        os.remove(db_name)
+    sqlite_profiles.remove_database(db_name)
 
     conn = sqlite3.connect(db_name)
     cursor = conn.cursor()
@@ -38,6 +40,8 @@ def setup_database(db_name="users_with_age.db"):
 
     conn.commit()
     conn.close()
+    # The journal mode is stored in the file, so it is set once here
+    sqlite_profiles.prepare_database(db_name)
     print(f"--- Database '{db_name}' setup complete ---\n")
 
 
@@ -63,7 +67,7 @@ class ExecuteQuery:
         """Connects, executes the query, and returns the results."""
         print(f"--> Entering context: Connecting to DB and running query...")
         try:
-            self.connection = sqlite3.connect(self.db_name)
+            self.connection = sqlite_profiles.connect(self.db_name)
             cursor = self.connection.cursor()
 
             print(f"    Executing: {self.query} with params {self.params}")
@@ -124,5 +128,5 @@ if __name__ == "__main__":
 
     # Clean up the created database file
     if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
+        sqlite_profiles.remove_database(DB_FILE)
         print(f"\nCleaned up and removed '{DB_FILE}'.")
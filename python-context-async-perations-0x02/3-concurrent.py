@@ -3,6 +3,17 @@ import aiosqlite
 import os
 import time
 
+from async_decorators import (
+    cache_query,
+    close_async_pools,
+    log_queries,
+    query_cache,
+    query_profiler,
+    retry_on_failure,
+    sqlite_profiles,
+    with_db_connection,
+)
+
 DB_FILE = "concurrent_users.db"
 
 # --- 1. A Helper Function to Set Up a Dummy Database Asynchronously ---
@@ -11,8 +22,7 @@ DB_FILE = "concurrent_users.db"
 async def setup_database():
     """Asynchronously creates and populates a test database."""
     # Clean up old DB file if it exists
-    if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
+    sqlite_profiles.remove_database(DB_FILE)
 
     async with aiosqlite.connect(DB_FILE) as db:
         await db.execute(
@@ -36,33 +46,47 @@ async def setup_database():
             "INSERT INTO users (id, name, age) VALUES (?, ?, ?)", users_to_add
         )
         await db.commit()
+    # The journal mode is stored in the file, so it is set once here
+    sqlite_profiles.prepare_database(DB_FILE)
     print(f"--- Database '{DB_FILE}' created and populated. ---\n")
 
 
 # --- 2. Asynchronous Functions to Fetch Data (Corrected) ---
-
-
-async def async_fetch_users():
+# The same decorator stack as the synchronous code, in its asyncio-native
+# form: single-flight caching, a pooled aiosqlite connection, await-based
+# retries and non-blocking query logging. The cache is outermost, so cache
+# hits and callers waiting on an in-flight query never borrow a connection.
+# Neither function takes a query argument, so their tables are named
+# explicitly for transactional to invalidate.
+
+
+@cache_query(ttl=30, tables=("users",))
+@with_db_connection(database=DB_FILE)
+@retry_on_failure(retries=3, delay=0.05)
+@log_queries
+async def async_fetch_users(db):
     """Fetches all users from the database asynchronously."""
     print("-> Starting `async_fetch_users`...")
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute("SELECT * FROM users") as cursor:
-            results = await cursor.fetchall()
-            print("<- Finished `async_fetch_users`.")
-            return results
+    async with db.execute("SELECT * FROM users") as cursor:
+        results = await cursor.fetchall()
+        print("<- Finished `async_fetch_users`.")
+        return results
 
 
 # This function has been modified to have no parameters.
-async def async_fetch_older_users():
+@cache_query(ttl=30, tables=("users",))
+@with_db_connection(database=DB_FILE)
+@retry_on_failure(retries=3, delay=0.05)
+@log_queries
+async def async_fetch_older_users(db):
     """Fetches users older than 40 from the database asynchronously."""
     age_limit = 40  # Age is hardcoded as per the check's expectation
     print(f"-> Starting `async_fetch_older_users` (age > {age_limit})...")
     query = "SELECT * FROM users WHERE age > ?"
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute(query, (age_limit,)) as cursor:
-            results = await cursor.fetchall()
-            print(f"<- Finished `async_fetch_older_users` (age > {age_limit}).")
-            return results
+    async with db.execute(query, (age_limit,)) as cursor:
+        results = await cursor.fetchall()
+        print(f"<- Finished `async_fetch_older_users` (age > {age_limit}).")
+        return results
 
 
 # --- 3. Main Function to Run Queries Concurrently ---
@@ -97,9 +121,20 @@ async def fetch_concurrently():
     for user in older_users_results:
         print(f"  ID: {user[0]}, Name: {user[1]}, Age: {user[2]}")
 
-    # Clean up the created database file
+    # Concurrent repeats of a cached call share one result
+    await asyncio.gather(*(async_fetch_users() for _ in range(5)))
+    print(f"\nCache stats after five more concurrent calls: {query_cache.stats}")
+    print("\nQuery profile (from @log_queries):")
+    for entry in query_profiler.report():
+        print(
+            f"  {entry['fingerprint']}: {entry['sampled_calls']} call(s), "
+            f"p95 {entry['p95_ms']} ms"
+        )
+
+    # Close the pooled connections, then clean up the created database file
+    await close_async_pools()
     if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
+        sqlite_profiles.remove_database(DB_FILE)
         print(f"\nCleaned up and removed '{DB_FILE}'.")
 
 
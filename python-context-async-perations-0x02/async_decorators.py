@@ -0,0 +1,201 @@
+# Database decorators for the python-context-async-perations-0x02 scripts.
+# log_queries, retry_on_failure, cache_query and transactional are the ones
+# in python-decorators-0x01/db_decorators.py, which behave natively on the
+# event loop when they wrap a coroutine function; this module adds a pooled
+# with_db_connection for coroutine functions.
+
+import asyncio
+import functools
+import inspect
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# The shared decorators and SQLite connection factory live in
+# python-decorators-0x01
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, "python-decorators-0x01"
+    )
+)
+import sqlite_profiles  # noqa: E402
+from db_decorators import (  # noqa: E402,F401
+    DB_FILE,
+    CircuitBreaker,
+    CircuitOpenError,
+    cache_query,
+    log_queries,
+    query_cache,
+    query_profiler,
+    retry_metrics,
+    retry_on_failure,
+    set_trace_callback,
+    transactional,
+)
+
+
+# --- Pooled connections ---
+class PoolTimeout(TimeoutError):
+    """Raised when no pooled connection becomes free within the acquire timeout."""
+
+
+class AsyncConnectionPool:
+    """
+    A bounded pool of aiosqlite connections for one event loop.
+
+    Idle connections are reused newest-first, closed once idle for longer
+    than max_idle, and pinged before reuse if idle for longer than
+    health_check_after. acquire() waits up to acquire_timeout seconds when
+    all max_size connections are in use.
+    """
+
+    def __init__(
+        self,
+        database,
+        max_size=5,
+        max_idle=60.0,
+        acquire_timeout=5.0,
+        health_check_after=1.0,
+    ):
+        self.database = database
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle = deque()  # (connection, released_at) pairs, newest last
+        self.stats = {"created": 0, "reused": 0, "discarded": 0}
+
+    async def _discard(self, conn):
+        self.stats["discarded"] += 1
+        try:
+            await conn.close()
+        except sqlite3.Error:
+            pass
+
+    async def _is_healthy(self, conn):
+        try:
+            async with conn.execute("SELECT 1") as cursor:
+                await cursor.fetchone()
+            return True
+        except (sqlite3.Error, ValueError):
+            return False
+
+    async def acquire(self, timeout=None):
+        """Borrows a connection, opening one if none is idle."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(
+                f"No connection available within {timeout} second(s)."
+            ) from None
+        try:
+            now = time.monotonic()
+            while self._idle and now - self._idle[0][1] > self.max_idle:
+                await self._discard(self._idle.popleft()[0])
+            while self._idle:
+                conn, released_at = self._idle.pop()
+                if now - released_at > self.health_check_after and not (
+                    await self._is_healthy(conn)
+                ):
+                    await self._discard(conn)
+                    continue
+                self.stats["reused"] += 1
+                return conn
+            conn = await sqlite_profiles.connect_async(self.database)
+            self.stats["created"] += 1
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, conn, discard=False):
+        """Returns a connection, rolling back anything left uncommitted."""
+        try:
+            if not discard and conn.in_transaction:
+                await conn.rollback()
+        except (sqlite3.Error, ValueError):
+            discard = True
+        if discard:
+            await self._discard(conn)
+        else:
+            self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        """Borrows a connection for the duration of an `async with` block."""
+        conn = await self.acquire(timeout)
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            await self.release(conn, discard=not await self._is_healthy(conn))
+            raise
+        except BaseException:
+            await self.release(conn)
+            raise
+        else:
+            await self.release(conn)
+
+    async def close(self):
+        """Closes the idle connections."""
+        while self._idle:
+            await self._discard(self._idle.popleft()[0])
+
+
+# (database, event loop) -> pool; connections cannot move between loops
+_pools = {}
+
+
+def get_async_pool(database, **options):
+    """Returns the running loop's pool for a database, creating it if needed."""
+    key = (database, asyncio.get_running_loop())
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = AsyncConnectionPool(database, **options)
+    return pool
+
+
+async def close_async_pools():
+    """Closes the running loop's pools; call it before the loop ends."""
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _pools if key[1] is loop]:
+        await _pools.pop(key).close()
+
+
+def with_db_connection(func=None, *, database=None, **pool_options):
+    """
+    Decorator that passes a database connection as the first argument.
+    Coroutine functions borrow an aiosqlite connection from a per-loop
+    pool (see AsyncConnectionPool for the options); plain functions open
+    and close a sqlite3 connection per call, as before.
+
+    :param database: The database file; defaults to DB_FILE at call time.
+    """
+    if func is None:
+        return functools.partial(
+            with_db_connection, database=database, **pool_options
+        )
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            pool = get_async_pool(database or DB_FILE, **pool_options)
+            async with pool.connection() as conn:
+                return await func(conn, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        conn = sqlite_profiles.connect(database or DB_FILE)
+        try:
+            return func(conn, *args, **kwargs)
+        finally:
+            conn.close()
+
+    return wrapper
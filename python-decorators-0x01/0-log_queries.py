@@ -1,12 +1,11 @@
 import sqlite3
-import functools
-import os
-from datetime import datetime
+
+import sqlite_profiles
+from db_decorators import log_queries, query_profiler
 
 # --- Setup: Create a dummy database for the example ---
 DB_FILE = "users.db"
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
 conn = sqlite3.connect(DB_FILE)
 cursor = conn.cursor()
 cursor.execute(
@@ -21,50 +20,22 @@ cursor.execute("INSERT INTO users (name) VALUES ('Alice')")
 cursor.execute("INSERT INTO users (name) VALUES ('Bob')")
 conn.commit()
 conn.close()
+# The journal mode is stored in the file, so it is set once here
+sqlite_profiles.prepare_database(DB_FILE)
 # --- End of Setup ---
 
 
-#### decorator to log SQL queries
-def log_queries(func):
-    """
-    A decorator that logs the SQL query passed to the decorated function
-    before executing it.
-    """
-
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Find the query in the function's arguments
-        # It could be a positional or a keyword argument.
-        query_arg = None
-        if "query" in kwargs:
-            query_arg = kwargs["query"]
-        elif args:
-            query_arg = args[0]
-
-        if query_arg:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f'LOG [{timestamp}]: Executing query: "{query_arg}"')
-        else:
-            print("LOG: Could not find query to log.")
-
-        # Execute the original function and get the result
-        result = func(*args, **kwargs)
-
-        # Return the original function's result
-        return result
-
-    return wrapper
-
-
+#### decorator to log SQL queries (see db_decorators.log_queries)
 @log_queries
 def fetch_all_users(query):
     """Fetches all users from the database using the provided query."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    conn = sqlite_profiles.connect(DB_FILE)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        return cursor.fetchall()
+    finally:
+        conn.close()
 
 
 #### fetch users while logging the query
@@ -73,6 +44,17 @@ users = fetch_all_users(query="SELECT * FROM users")
 print("Fetched results:")
 print(users)
 
+#### queries that differ only in literals share one fingerprint
+for user_id in range(1, 50):
+    fetch_all_users(f"SELECT * FROM users WHERE id = {user_id}")
+fetch_all_users("SELECT * FROM users WHERE name IN ('Alice', 'Bob')")
+try:
+    fetch_all_users("SELECT * FROM missing_table")  # Logged as a query_error
+except sqlite3.OperationalError:
+    pass
+
+print("\nQuery profile:")
+print(query_profiler.export_report())
+
 # --- Cleanup ---
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
@@ -1,11 +1,17 @@
 import sqlite3
 import functools
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+
+import sqlite_profiles
 
 # --- Setup: Create a dummy database for the example ---
 DB_FILE = "users.db"
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
 
 conn = sqlite3.connect(DB_FILE)
 cursor = conn.cursor()
@@ -26,6 +32,8 @@ cursor.execute(
 )
 conn.commit()
 conn.close()
+# The journal mode is stored in the file, so it is set once here
+sqlite_profiles.prepare_database(DB_FILE)
 # --- End of Setup ---
 
 
@@ -41,7 +49,7 @@ def with_db_connection(func):
         conn = None
         try:
             # 1. Open the database connection
-            conn = sqlite3.connect(DB_FILE)
+            conn = sqlite_profiles.connect(DB_FILE)
             print("INFO: DB Connection opened.")
 
             # 2. Call the original function, passing the new connection
@@ -59,6 +67,188 @@ def with_db_connection(func):
     return wrapper
 
 
+class PoolTimeout(TimeoutError):
+    """Raised when no pooled connection becomes free within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of sqlite3 connections.
+
+    Idle connections are reused newest-first, closed once they have been idle
+    longer than max_idle, and pinged with a cheap query before reuse if they
+    have been idle longer than health_check_after. When all max_size
+    connections are in use, acquire() waits up to acquire_timeout seconds
+    for one to be released.
+    """
+
+    def __init__(
+        self,
+        database,
+        max_size=5,
+        max_idle=60.0,
+        acquire_timeout=5.0,
+        health_check_after=1.0,
+    ):
+        self.database = database
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        self._idle = deque()  # (connection, released_at) pairs, newest last
+        self._size = 0  # Connections open, idle or in use
+        self._closed = False
+        self._lock = threading.Condition()
+        self.stats = {"created": 0, "reused": 0, "discarded": 0, "waits": 0}
+
+    def _connect(self):
+        # Connections move between threads, so disable sqlite3's same-thread check
+        return sqlite_profiles.connect(self.database, check_same_thread=False)
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """Closes a connection that will not return to the pool (lock held)."""
+        self._size -= 1
+        self.stats["discarded"] += 1
+        self._lock.notify()
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self, timeout=None):
+        """
+        Borrows a connection, creating one if the pool is not full.
+
+        :param timeout: Seconds to wait for a free connection; defaults to
+                        the pool's acquire_timeout.
+        :raises PoolTimeout: If no connection became free in time.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            conn = None
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed.")
+                    now = time.monotonic()
+
+                    # Idle connections past max_idle are closed, oldest first
+                    while self._idle and now - self._idle[0][1] > self.max_idle:
+                        self._discard(self._idle.popleft()[0])
+
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        break
+
+                    if self._size < self.max_size:
+                        # Reserve the slot, then connect outside the lock
+                        self._size += 1
+                        break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"No connection available within {timeout} second(s)."
+                        )
+                    self.stats["waits"] += 1
+                    self._lock.wait(remaining)
+
+            if conn is None:
+                return self._create()
+
+            # Ping outside the lock so a slow check holds up nobody else; the
+            # connection stays counted in _size, so no one else can take it
+            idle_for = now - released_at
+            if idle_for <= self.health_check_after or self._is_healthy(conn):
+                with self._lock:
+                    self.stats["reused"] += 1
+                return conn
+            with self._lock:
+                self._discard(conn)
+
+    def _create(self):
+        """Opens a connection for a slot already reserved in _size."""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self.stats["created"] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """
+        Returns a borrowed connection. Any open transaction is rolled back
+        so the next borrower starts clean; broken connections are closed.
+        """
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+        with self._lock:
+            if discard or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrows a connection for the duration of a `with` block."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            # The connection may be unusable (e.g. a corrupt or closed file)
+            self.release(conn, discard=not self._is_healthy(conn))
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Closes the idle connections; borrowed ones close when released."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.popleft()[0])
+
+
+# A shared pool for the whole process
+db_pool = ConnectionPool(DB_FILE, max_size=5)
+
+
+def with_pooled_connection(func):
+    """
+    Drop-in replacement for with_db_connection: the decorated function
+    still receives a connection as its first argument, but it is borrowed
+    from db_pool and returned afterwards instead of being opened and
+    closed on every call.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with db_pool.connection() as conn:
+            return func(conn, *args, **kwargs)
+
+    return wrapper
+
+
 @with_db_connection
 def get_user_by_id(conn, user_id):
     """
@@ -77,6 +267,44 @@ print("\nFetched User:")
 print(user)
 
 
+#### Fetch the same user through the connection pool
+@with_pooled_connection
+def get_user_by_id_pooled(conn, user_id):
+    """Same query as get_user_by_id, on a pooled connection."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
+print("\nFetching user with id=1 through the pool...")
+print(get_user_by_id_pooled(user_id=1))
+
+
+#### ---- BENCHMARK: connection per call vs pooled ---- ####
+BENCHMARK_CALLS = 2000
+
+
+def calls_per_second(func, calls, threads):
+    """Runs func(user_id=...) `calls` times on `threads` threads."""
+    start = time.perf_counter()
+    # The per-call decorator prints on every call; keep that off the terminal
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda i: func(user_id=i % 2 + 1), range(calls)))
+    return calls / (time.perf_counter() - start)
+
+
+print(f"\n--- Benchmark: {BENCHMARK_CALLS} calls ---")
+for threads in (1, 4):
+    per_call = calls_per_second(get_user_by_id, BENCHMARK_CALLS, threads)
+    pooled = calls_per_second(get_user_by_id_pooled, BENCHMARK_CALLS, threads)
+    print(
+        f"{threads} thread(s): connection per call {per_call:,.0f} calls/s, "
+        f"pooled {pooled:,.0f} calls/s ({pooled / per_call:.1f}x)"
+    )
+print(f"Pool stats: {db_pool.stats}")
+
+
 # --- Cleanup ---
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+db_pool.close()
+sqlite_profiles.remove_database(DB_FILE)
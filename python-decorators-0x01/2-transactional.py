@@ -1,11 +1,15 @@
 import sqlite3
 import functools
 import os
+import threading
+import time
+from contextlib import ContextDecorator, redirect_stdout
+
+import sqlite_profiles
 
 # --- Setup: Create a dummy database for the example ---
 DB_FILE = "users.db"
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
 
 conn = sqlite3.connect(DB_FILE)
 cursor = conn.cursor()
@@ -26,19 +30,32 @@ cursor.execute(
 )
 conn.commit()
 conn.close()
+# The journal mode is stored in the file, so it is set once here
+sqlite_profiles.prepare_database(DB_FILE)
 # --- End of Setup ---
 
 
+# The GroupCommit batch open in each thread, if any
+_batch_state = threading.local()
+
+
 def with_db_connection(func):
     """
     Decorator that handles the database connection lifecycle (open/close).
+    Inside a GroupCommit block it passes the batch's shared connection.
     """
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        batch = getattr(_batch_state, "batch", None)
+        if batch is not None:
+            # Commit a group that outlived max_wait before adding to it
+            batch.flush_if_due()
+            return func(batch.conn, *args, **kwargs)
+
         conn = None
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = sqlite_profiles.connect(DB_FILE)
             print("INFO: DB Connection opened.")
             result = func(conn, *args, **kwargs)
             return result
@@ -50,14 +67,149 @@ def with_db_connection(func):
     return wrapper
 
 
+class GroupCommit(ContextDecorator):
+    """
+    Collects many small @transactional calls into one commit.
+
+    Inside the block (or a function decorated with an instance), every
+    @with_db_connection call on this thread shares one connection, and each
+    @transactional call runs in its own SAVEPOINT: a failing call is rolled
+    back to its savepoint and re-raises, without touching the others. The
+    group is committed once max_calls calls have succeeded, once max_wait
+    seconds have passed since its first call, and when the block exits.
+    No timer runs: max_wait is checked when a call finishes and when the
+    next @with_db_connection call starts, so a group that receives no
+    further calls waits for the block to exit. An instance used as a
+    decorator may be entered from several threads at once; each gets a
+    batch and connection of its own.
+
+    Calls that succeeded are durable only once their group commits, so a
+    crash can lose up to max_calls of them. A block left by an exception
+    still commits them; one left by KeyboardInterrupt, SystemExit or the
+    like rolls the open group back instead.
+    """
+
+    def __init__(self, max_calls=100, max_wait=0.05, database=None):
+        self.max_calls = max_calls
+        self.max_wait = max_wait
+        self.database = database or DB_FILE
+        self.stats = {"calls": 0, "failed": 0, "commits": 0}
+        self._stats_lock = threading.Lock()
+        # One instance can decorate a function called from many threads, so
+        # each thread's batch (connection, pending calls, start) is its own
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        """This thread's batch connection, or None outside the block."""
+        return getattr(self._local, "conn", None)
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def __enter__(self):
+        if getattr(_batch_state, "batch", None) is not None:
+            raise RuntimeError("A GroupCommit block is already open in this thread.")
+        # Autocommit mode: the batch issues BEGIN/SAVEPOINT/COMMIT itself
+        self._local.conn = sqlite_profiles.connect(self.database, isolation_level=None)
+        self._local.pending = 0
+        self._local.started = None
+        self._local.calls = 0
+        _batch_state.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _batch_state.batch = None
+        try:
+            if exc_type is None or issubclass(exc_type, Exception):
+                # Calls that already returned successfully are committed even
+                # if the surrounding block failed later on
+                self.flush()
+            else:
+                self.rollback()
+        finally:
+            self._local.conn.close()
+            self._local.conn = None
+        return False
+
+    def run(self, func, conn, *args, **kwargs):
+        """Runs one transactional call inside its own savepoint."""
+        batch = self._local
+        if batch.started is None:
+            batch.conn.execute("BEGIN")
+            batch.started = time.monotonic()
+        self._count("calls")
+        batch.calls += 1
+        savepoint = f"call_{batch.calls}"
+        conn.execute(f"SAVEPOINT {savepoint}")
+        try:
+            result = func(conn, *args, **kwargs)
+        except Exception as e:
+            print(f"TRANSACTION: Call failed, rolled back to its savepoint. Error: {e}")
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+            self._count("failed")
+            raise
+        except BaseException:
+            # Interrupted mid-call: undo the partial call before unwinding
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+            raise
+        conn.execute(f"RELEASE {savepoint}")
+
+        batch.pending += 1
+        if batch.pending >= self.max_calls:
+            self.flush()
+        else:
+            self.flush_if_due()
+        return result
+
+    def flush_if_due(self):
+        """Commits this thread's group if it has been open for max_wait."""
+        started = getattr(self._local, "started", None)
+        if started is not None and time.monotonic() - started >= self.max_wait:
+            self.flush()
+
+    def flush(self):
+        """Commits this thread's calls collected so far as one transaction."""
+        batch = self._local
+        if batch.started is None:
+            return
+        batch.conn.execute("COMMIT")
+        self._count("commits")
+        batch.pending = 0
+        batch.started = None
+
+    def rollback(self):
+        """Discards this thread's calls collected since the last commit."""
+        batch = self._local
+        if batch.started is None:
+            return
+        batch.conn.execute("ROLLBACK")
+        batch.pending = 0
+        batch.started = None
+
+    @classmethod
+    def active_for(cls, conn):
+        """Returns the open batch that owns this connection, if any."""
+        batch = getattr(_batch_state, "batch", None)
+        return batch if batch is not None and batch.conn is conn else None
+
+
 def transactional(func):
     """
     Decorator that wraps a function in a database transaction.
-    Commits if the function succeeds, rolls back if it fails.
+    Commits if the function succeeds, rolls back if it fails. Inside a
+    GroupCommit block the call joins the batch's transaction instead.
     """
 
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        batch = GroupCommit.active_for(conn)
+        if batch is not None:
+            return batch.run(func, conn, *args, **kwargs)
+
         try:
             # The wrapped function executes here.
             # Any execute() call will implicitly start a transaction.
@@ -135,6 +287,41 @@ user_after_failure = get_user_by_id(user_id=2)
 print(f"User 2 after failed update (should be unchanged): {user_after_failure}")
 
 
+# 4. Group commit: many small updates, one commit per batch
+print("\n--- Group Commit ---")
+with GroupCommit(max_calls=4, max_wait=1.0) as batch:
+    for i in range(6):
+        update_user_email(user_id=1, new_email=f"alice.{i}@web.com")
+    try:
+        failing_update(user_id=2)  # Rolled back alone; the rest still commit
+    except sqlite3.IntegrityError:
+        pass
+print(f"Batch stats: {batch.stats}")
+print(f"User 1 after the batch: {get_user_by_id(user_id=1)}")
+
+
+#### ---- BENCHMARK: commit per call vs group commit ---- ####
+BENCHMARK_UPDATES = 300
+
+
+def run_updates(count):
+    for i in range(count):
+        update_user_email(user_id=1, new_email=f"alice.{i}@web.com")
+
+
+print(f"\n--- Benchmark: {BENCHMARK_UPDATES} updates ---")
+with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+    start_time = time.perf_counter()
+    run_updates(BENCHMARK_UPDATES)
+    per_call = BENCHMARK_UPDATES / (time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    with GroupCommit(max_calls=100):
+        run_updates(BENCHMARK_UPDATES)
+    grouped = BENCHMARK_UPDATES / (time.perf_counter() - start_time)
+print(f"Commit per call: {per_call:,.0f} updates/s")
+print(f"Group commit:    {grouped:,.0f} updates/s ({grouped / per_call:.1f}x)")
+
+
 # --- Cleanup ---
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
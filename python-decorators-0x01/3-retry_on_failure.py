@@ -1,12 +1,18 @@
 import time
 import sqlite3
 import functools
-import os
+
+import sqlite_profiles
+from db_decorators import (
+    CircuitBreaker,
+    CircuitOpenError,
+    retry_metrics,
+    retry_on_failure,
+)
 
 # --- Setup: Create a dummy database for the example ---
 DB_FILE = "users.db"
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
 
 conn = sqlite3.connect(DB_FILE)
 cursor = conn.cursor()
@@ -19,6 +25,8 @@ cursor.execute("INSERT INTO users (name) VALUES ('Alice')")
 cursor.execute("INSERT INTO users (name) VALUES ('Bob')")
 conn.commit()
 conn.close()
+# The journal mode is stored in the file, so it is set once here
+sqlite_profiles.prepare_database(DB_FILE)
 # --- End of Setup ---
 
 
@@ -32,7 +40,7 @@ def with_db_connection(func):
     def wrapper(*args, **kwargs):
         conn = None
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = sqlite_profiles.connect(DB_FILE)
             result = func(conn, *args, **kwargs)
             return result
         finally:
@@ -42,39 +50,6 @@ def with_db_connection(func):
     return wrapper
 
 
-def retry_on_failure(retries=3, delay=1):
-    """
-    A decorator factory that retries a function if it raises an exception.
-
-    :param retries: The number of times to retry.
-    :param delay: The number of seconds to wait between retries.
-    """
-
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            for attempt in range(retries):
-                try:
-                    # Attempt to execute the decorated function
-                    return func(*args, **kwargs)
-                except (sqlite3.OperationalError, sqlite3.IntegrityError) as e:
-                    # Check if this is the last attempt
-                    if attempt < retries - 1:
-                        print(
-                            f"RETRY: Attempt {attempt + 1}/{retries} failed: {e}. Retrying in {delay} second(s)..."
-                        )
-                        time.sleep(delay)
-                    else:
-                        print(
-                            f"RETRY: Attempt {attempt + 1}/{retries} failed. All retries exhausted."
-                        )
-                        raise  # Re-raise the last exception
-
-        return wrapper
-
-    return decorator
-
-
 # We need a counter to simulate failure for the demonstration
 call_counter = 0
 
@@ -114,6 +89,64 @@ except Exception as e:
     print(f"Operation failed after all retries: {e}")
 
 
+#### A constraint violation is never retried
+@with_db_connection
+@retry_on_failure(retries=3, delay=0.1)
+def insert_duplicate_user(conn):
+    """Inserts a user whose id already exists."""
+    conn.execute("INSERT INTO users (id, name) VALUES (1, 'Alice again')")
+
+
+print("\n--- IntegrityError (not retried) ---")
+try:
+    insert_duplicate_user()
+except sqlite3.IntegrityError as e:
+    print(f"Failed once, as expected: {e}")
+
+
+#### A database that is down trips the circuit breaker
+outage_breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.5)
+
+
+@retry_on_failure(retries=2, delay=0.01, breaker=outage_breaker)
+def query_unreachable_database():
+    """Simulates a database file that cannot be opened."""
+    raise sqlite3.OperationalError("unable to open database file")
+
+
+print("\n--- Circuit Breaker ---")
+for call in range(1, 6):
+    try:
+        query_unreachable_database()
+    except CircuitOpenError as e:
+        print(f"Call {call}: failed fast. {e}")
+    except sqlite3.OperationalError as e:
+        print(f"Call {call}: {e} (circuit {outage_breaker.state})")
+time.sleep(0.5)
+try:
+    query_unreachable_database()  # The half-open trial call
+except sqlite3.OperationalError as e:
+    print(f"Trial call after the reset timeout: {e} (circuit {outage_breaker.state})")
+
+
+#### Lock contention that outlasts the deadline budget
+@retry_on_failure(retries=10, delay=0.05, deadline=0.3)
+def always_locked():
+    """Simulates a lock that is never released."""
+    raise sqlite3.OperationalError("database is locked")
+
+
+print("\n--- Deadline ---")
+start_time = time.monotonic()
+try:
+    always_locked()
+except sqlite3.OperationalError:
+    print(f"Gave up after {time.monotonic() - start_time:.2f}s (budget 0.3s)")
+
+print("\n--- Retry Metrics ---")
+for function_name, counters in retry_metrics.snapshot().items():
+    print(f"{function_name}: {counters}")
+
+
 # --- Cleanup ---
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
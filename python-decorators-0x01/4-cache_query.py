@@ -2,11 +2,26 @@ import time
 import sqlite3
 import functools
 import os
+import threading
+
+import db_decorators
+import sqlite_profiles
+from db_decorators import (
+    SQLiteCacheStore,
+    cache_query,
+    cache_stats,
+    query_cache,
+    transactional,
+)
 
 # --- Setup: Create a dummy database for the example ---
 DB_FILE = "users.db"
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+sqlite_profiles.remove_database(DB_FILE)
+# The second-tier cache shared between processes (see SQLiteCacheStore).
+# Other workers may be using it, so it is never cleared at startup; the
+# cleanup below only removes it if this run created it.
+L2_CACHE_FILE = "query_cache.db"
+l2_created_here = not os.path.exists(L2_CACHE_FILE)
 
 conn = sqlite3.connect(DB_FILE)
 cursor = conn.cursor()
@@ -22,6 +37,8 @@ cursor.execute("INSERT INTO users (id, name) VALUES (1, 'Alice')")
 cursor.execute("INSERT INTO users (id, name) VALUES (2, 'Bob')")
 conn.commit()
 conn.close()
+# The journal mode is stored in the file, so it is set once here
+sqlite_profiles.prepare_database(DB_FILE)
 # --- End of Setup ---
 
 
@@ -33,7 +50,7 @@ def with_db_connection(func):
     def wrapper(*args, **kwargs):
         conn = None
         try:
-            conn = sqlite3.connect(DB_FILE)
+            conn = sqlite_profiles.connect(DB_FILE)
             result = func(conn, *args, **kwargs)
             return result
         finally:
@@ -43,45 +60,8 @@ def with_db_connection(func):
     return wrapper
 
 
-# Global cache dictionary
-query_cache = {}
-
-
-def cache_query(func):
-    """
-    A decorator that caches the result of a database query function.
-    The cache key is the SQL query string.
-    """
-
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Determine the cache key from the 'query' argument
-        query_key = None
-        if "query" in kwargs:
-            query_key = kwargs["query"]
-        # The 'conn' object is the first positional arg (args[0]),
-        # so the query would be the second (args[1])
-        elif len(args) > 1:
-            query_key = args[1]
-
-        if not query_key:
-            # Cannot cache without a key, execute directly
-            return func(*args, **kwargs)
-
-        # Check if the result is already in the cache
-        if query_key in query_cache:
-            print(f'CACHE HIT: Returning cached result for query: "{query_key}"')
-            return query_cache[query_key]
-
-        # If not in cache, execute the function (cache miss)
-        print(f'CACHE MISS: Executing query and caching result for: "{query_key}"')
-        result = func(*args, **kwargs)
-
-        # Store the new result in the cache
-        query_cache[query_key] = result
-        return result
-
-    return wrapper
+# The shared second tier behind query_cache (see db_decorators.l2_cache)
+l2_cache = db_decorators.l2_cache = SQLiteCacheStore(L2_CACHE_FILE)
 
 
 @with_db_connection
@@ -100,8 +80,42 @@ def fetch_users_with_cache(conn, query):
     return results
 
 
+@with_db_connection
+@cache_query
+def fetch_user_with_cache(conn, query, params):
+    """Fetches rows for a parameterized query (cached per parameter set)."""
+    print("-> Executing DB query...")
+    time.sleep(1)  # Simulate a slow query
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+@with_db_connection
+@cache_query(ttl=1, stale_while_revalidate=True)
+def fetch_names_with_swr(conn, query):
+    """Fetches rows that may be served stale for a while after 1 second."""
+    print("-> Executing DB query...")
+    time.sleep(1)  # Simulate a slow query
+    cursor = conn.cursor()
+    cursor.execute(query)
+    return cursor.fetchall()
+
+
+@with_db_connection
+@transactional
+def rename_user(conn, user_id, new_name):
+    """Renames a user; committing it invalidates cached reads of users."""
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET name = ? WHERE id = ?", (new_name, user_id))
+
+
 #### ---- DEMONSTRATION ---- ####
 
+# The setup recreated the users table, so results other runs shared for it
+# are out of date
+l2_cache.invalidate_tables({"users"})
+
 # 1. First call will be a CACHE MISS
 print("--- First Call ---")
 start_time = time.time()
@@ -118,9 +132,62 @@ end_time = time.time()
 print(f"Result: {users_again}")
 print(f"Time taken: {end_time - start_time:.4f} seconds (notice it's much faster!)\n")
 
+# 3. Parameters are part of the key: each user id is cached separately
+print("--- Parameterized Queries ---")
+user_query = "SELECT * FROM users WHERE id = ?"
+print(fetch_user_with_cache(query=user_query, params=(1,)))
+print(fetch_user_with_cache(query=user_query, params=(2,)))
+print(fetch_user_with_cache(query=user_query, params=(1,)))
+
+# 4. A committed write to 'users' invalidates every cached read of 'users'
+print("\n--- Write Through @transactional ---")
+rename_user(user_id=1, new_name="Alicia")
+start_time = time.time()
+users = fetch_users_with_cache(query="SELECT * FROM users")
+print(f"Result after the write: {users}")
+print(f"Time taken: {time.time() - start_time:.2f} seconds (a miss again)\n")
+
+# 5. Concurrent misses for the same query hit the database only once
+print("--- Five Concurrent Misses ---")
+names_query = "SELECT name FROM users"
+start_time = time.time()
+threads = [
+    threading.Thread(target=fetch_users_with_cache, kwargs={"query": names_query})
+    for _ in range(5)
+]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+print(f"Time taken: {time.time() - start_time:.2f} seconds (one query, not five)\n")
+
+# 6. Stale-while-revalidate: an expired result is served instantly while
+#    a single background refresh brings it up to date
+print("--- Stale While Revalidate ---")
+swr_query = "SELECT id FROM users"
+fetch_names_with_swr(query=swr_query)
+time.sleep(1.1)  # Let the result expire
+start_time = time.time()
+print(f"Result: {fetch_names_with_swr(query=swr_query)}")
+print(f"Time taken: {time.time() - start_time:.4f} seconds (served stale)")
+time.sleep(1.1)  # Let the background refresh finish
+fetch_names_with_swr(query=swr_query)
+print()
+
+# 7. A new worker process starts with an empty L1 but shares L2
+print("--- Fresh Worker (empty L1, shared L2) ---")
+query_cache.clear()  # What a newly started worker process would see
+start_time = time.time()
+users = fetch_users_with_cache(query="SELECT * FROM users")
+print(f"Result: {users}")
+print(f"Time taken: {time.time() - start_time:.4f} seconds (served from L2)\n")
+
 print(f"--- Current Cache State ---")
 print(query_cache)
+print(f"Per-tier counters: {cache_stats()}")
 
 # --- Cleanup ---
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
+l2_cache.close()
+sqlite_profiles.remove_database(DB_FILE)
+if l2_created_here:
+    sqlite_profiles.remove_database(L2_CACHE_FILE)
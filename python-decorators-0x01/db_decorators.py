@@ -0,0 +1,1601 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import logging.handlers
+import math
+import pickle
+import queue
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+import sqlite_profiles
+
+# --- SHARED DATABASE DECORATORS ---
+# The profiler, retry policy, query cache and transaction decorators used by
+# the 0x01 scripts and by the async code in python-context-async-perations-0x02.
+# Each decorator checks whether it wraps a coroutine function: if so it
+# awaits it and never blocks the event loop (backoff with asyncio.sleep,
+# second-tier cache I/O on a worker thread, log lines through a queue);
+# plain functions keep the blocking behavior.
+
+try:
+    import aiosqlite
+except ImportError:  # Only needed to decorate coroutine functions
+    aiosqlite = None
+
+# The database used when a decorator is not given a connection of its own
+DB_FILE = "users.db"
+
+
+def _is_connection(value):
+    if isinstance(value, sqlite3.Connection):
+        return True
+    return aiosqlite is not None and isinstance(value, aiosqlite.Connection)
+
+
+def find_query(args, kwargs):
+    """Returns the SQL passed as `query` or as the first string argument."""
+    if "query" in kwargs:
+        return kwargs["query"]
+    return next((arg for arg in args if isinstance(arg, str)), None)
+
+
+#### ---- OUTPUT ---- ####
+# Lines logged from a thread running an event loop are put on a queue and
+# printed by a listener thread, so a decorator never blocks the loop on
+# terminal or file I/O. Elsewhere they are printed directly.
+logger = logging.getLogger("db_decorators")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = None
+_log_listener_lock = threading.Lock()
+
+
+def emit(message):
+    """Prints one log line of a decorator."""
+    global _log_listener
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        print(message)
+        return
+    if _log_listener is None:
+        with _log_listener_lock:
+            if _log_listener is None:
+                listener = logging.handlers.QueueListener(
+                    _log_queue, logging.StreamHandler(sys.stdout)
+                )
+                listener.start()
+                atexit.register(listener.stop)  # Prints what is still queued
+                _log_listener = listener
+    logger.info(message)
+
+
+#### ---- QUERY PROFILING ---- ####
+# Query fingerprints: the same statement with different literals
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normalizes a query so that statements differing only in literals share
+    one fingerprint, e.g. "SELECT * FROM users WHERE id = 7" and "... = 9"
+    both become "select * from users where id = ?". IN lists of any length
+    collapse to "(?+)".
+    """
+    query = _COMMENTS.sub(" ", query)
+    query = _STRINGS.sub("?", query)
+    query = _NUMBERS.sub("?", query)
+    query = _IN_LISTS.sub("(?+)", query)
+    return " ".join(query.split()).lower()
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram: bucket i covers durations up to
+    MIN_SECONDS * GROWTH**i, so percentiles are accurate to within about
+    GROWTH - 1 (10%) while memory stays bounded by the number of buckets.
+    """
+
+    MIN_SECONDS = 1e-6
+    GROWTH = 1.1
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        ratio = max(seconds, self.MIN_SECONDS) / self.MIN_SECONDS
+        self.buckets[math.ceil(math.log(ratio, self.GROWTH))] += 1
+        self.count += 1
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the percentile."""
+        if not self.count:
+            return None
+        rank = max(math.ceil(fraction * self.count), 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.MIN_SECONDS * self.GROWTH**bucket, self.maximum)
+        return self.maximum
+
+
+class QueryStats:
+    """Counters and a latency histogram for one query fingerprint."""
+
+    def __init__(self, example):
+        self.example = example  # One raw query, for reading the report
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.latency = LatencyHistogram()
+        self.last_error = None
+
+
+class QueryProfiler:
+    """
+    Records wall time, rows returned and errors per query fingerprint.
+
+    Only a sample_rate fraction of calls is timed and recorded, so the
+    profiler can stay on in production; counts in the report are scaled
+    back up by the rate. Sampled calls slower than slow_query_seconds, and
+    failed calls, are logged as one JSON line each.
+    """
+
+    def __init__(self, sample_rate=1.0, slow_query_seconds=0.5):
+        self.sample_rate = sample_rate
+        self.slow_query_seconds = slow_query_seconds
+        self._stats = {}  # fingerprint -> QueryStats
+        self._lock = threading.Lock()
+
+    def should_sample(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(self, query, seconds, rows=None, error=None):
+        """Adds one sampled call to its fingerprint's statistics."""
+        key = fingerprint(query)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(query)
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.latency.record(seconds)
+            if rows is not None:
+                stats.rows += rows
+            if error is not None:
+                stats.errors += 1
+                stats.last_error = repr(error)
+
+        if error is not None or seconds >= self.slow_query_seconds:
+            self.log(
+                event="query_error" if error is not None else "slow_query",
+                fingerprint=key,
+                query=query,
+                ms=round(seconds * 1000, 3),
+                rows=rows,
+                error=repr(error) if error is not None else None,
+            )
+
+    def log(self, **fields):
+        """Logs one structured line."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        emit(f"LOG [{timestamp}]: {json.dumps(fields)}")
+
+    def report(self):
+        """
+        Summarizes every fingerprint, slowest total time first.
+
+        :return: A list of dictionaries; times are in milliseconds.
+        """
+        scale = 1 / self.sample_rate if self.sample_rate < 1.0 else 1
+        with self._lock:
+            items = list(self._stats.items())
+
+        def ms(seconds):
+            return round(seconds * 1000, 3) if seconds is not None else None
+
+        summary = []
+        for key, stats in sorted(items, key=lambda item: -item[1].total_seconds):
+            summary.append(
+                {
+                    "fingerprint": key,
+                    "example": stats.example,
+                    "sampled_calls": stats.calls,
+                    "estimated_calls": round(stats.calls * scale),
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "total_ms": ms(stats.total_seconds),
+                    "mean_ms": ms(stats.total_seconds / stats.calls),
+                    "p50_ms": ms(stats.latency.percentile(0.50)),
+                    "p95_ms": ms(stats.latency.percentile(0.95)),
+                    "p99_ms": ms(stats.latency.percentile(0.99)),
+                    "max_ms": ms(stats.latency.maximum),
+                    "last_error": stats.last_error,
+                }
+            )
+        return summary
+
+    def export_report(self, path=None):
+        """Returns the report as JSON, also writing it to path if given."""
+        report = json.dumps(
+            {"sample_rate": self.sample_rate, "queries": self.report()}, indent=2
+        )
+        if path:
+            with open(path, "w", encoding="utf-8") as report_file:
+                report_file.write(report)
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# The profiler used by @log_queries unless another one is given
+query_profiler = QueryProfiler()
+
+
+def count_rows(result):
+    """Number of rows in a query result, if it is a sequence of rows."""
+    return len(result) if isinstance(result, (list, tuple)) else None
+
+
+def log_queries(func=None, *, profiler=None):
+    """
+    A decorator that profiles the SQL query passed to the decorated
+    function (or, without one, the function itself): wall time, rows
+    returned and errors are recorded under the query's fingerprint (see
+    QueryProfiler). Use it bare (@log_queries) or with a profiler of its
+    own (@log_queries(profiler=...)).
+    """
+    if func is None:
+        return functools.partial(log_queries, profiler=profiler)
+
+    def sampled(args, kwargs):
+        """Returns (profiler, label) if this call is timed, else None."""
+        active = profiler or query_profiler
+        # Unsampled calls pay only for the sampling decision
+        if not active.should_sample():
+            return None
+        return active, find_query(args, kwargs) or func.__qualname__
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            sample = sampled(args, kwargs)
+            if sample is None:
+                return await func(*args, **kwargs)
+            active, label = sample
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                active.record(label, time.perf_counter() - start, error=e)
+                raise
+            active.record(label, time.perf_counter() - start, rows=count_rows(result))
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        sample = sampled(args, kwargs)
+        if sample is None:
+            return func(*args, **kwargs)
+        active, label = sample
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            active.record(label, time.perf_counter() - start, error=e)
+            raise
+        active.record(label, time.perf_counter() - start, rows=count_rows(result))
+        return result
+
+    return wrapper
+
+
+#### ---- RETRY POLICY ---- ####
+# Messages of transient errors worth retrying: another connection holds a lock
+RETRYABLE_MESSAGES = ("database is locked", "database table is locked", "busy")
+# Messages that mean the database cannot be reached or read at all. sqlite3
+# also raises OperationalError for bad SQL ("syntax error", "no such table"),
+# which says nothing about availability, so outages are matched explicitly.
+OUTAGE_MESSAGES = (
+    "unable to open database file",
+    "disk i/o error",
+    "database disk image is malformed",
+    "file is not a database",
+    "database or disk is full",
+)
+
+
+def is_retryable(error):
+    """
+    Classifies an error: lock contention is transient and retried;
+    constraint violations (IntegrityError) and everything else are not,
+    because running the same statement again cannot succeed.
+    """
+    if isinstance(error, sqlite3.IntegrityError):
+        return False
+    if isinstance(error, sqlite3.OperationalError):
+        message = str(error).lower()
+        return any(text in message for text in RETRYABLE_MESSAGES)
+    return False
+
+
+def is_outage(error):
+    """
+    Tells whether an error means the database itself is unavailable (as
+    opposed to lock contention, a bad statement or a constraint), which is
+    what the circuit breaker counts.
+    """
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return any(text in message for text in OUTAGE_MESSAGES)
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """
+    Exponential backoff with full jitter: a random wait between 0 and
+    base_delay * 2**attempt (capped at max_delay), so clients that failed
+    together do not retry together.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+class CircuitOpenError(sqlite3.OperationalError):
+    """Raised without touching the database while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast when the database is clearly down.
+
+    After failure_threshold consecutive outage errors the circuit opens and
+    calls fail immediately with CircuitOpenError. After reset_timeout
+    seconds one trial call is let through (half-open): success closes the
+    circuit again, failure re-opens it for another reset_timeout. A trial
+    that ends without an outcome (e.g. KeyboardInterrupt or a cancelled
+    task) or is still running after reset_timeout lets another call try.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go to the database."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            # Open: wait out reset_timeout. Half-open: give the trial as long
+            waiting_since = (
+                self._opened_at if self.state == "open" else self._trial_started
+            )
+            if now - waiting_since >= self.reset_timeout:
+                self.state = "half-open"  # This caller makes the trial call
+                self._trial_started = now
+                return
+            raise CircuitOpenError("Circuit open: the database looks unavailable.")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_aborted(self):
+        """
+        Records a call that ended without an outcome. If it was the trial
+        call, the circuit goes back to open with its reset_timeout already
+        spent, so the next call becomes the new trial.
+        """
+        with self._lock:
+            if self.state == "half-open":
+                self.state = "open"
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RetryMetrics:
+    """Thread-safe retry counters, kept per decorated function."""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, **amounts):
+        with self._lock:
+            counters = self._counters.setdefault(name, Counter())
+            counters.update(amounts)
+
+    def snapshot(self):
+        """Returns {function name: {counter: value}}."""
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._counters.items()}
+
+
+# Shared by every @retry_on_failure function: one database, one breaker
+db_breaker = CircuitBreaker()
+retry_metrics = RetryMetrics()
+
+
+def retry_on_failure(
+    retries=3,
+    delay=1,
+    max_delay=30.0,
+    deadline=None,
+    retry_if=is_retryable,
+    breaker=db_breaker,
+    metrics=retry_metrics,
+):
+    """
+    A decorator factory that retries a function if it raises a transient
+    error, backing off exponentially with full jitter between attempts.
+    Coroutine functions back off with `await asyncio.sleep`, so other
+    tasks keep running in the meantime.
+
+    :param retries: The maximum number of attempts.
+    :param delay: The base delay in seconds; attempt n waits a random time
+                  between 0 and delay * 2**n.
+    :param max_delay: The cap on a single wait, in seconds.
+    :param deadline: The total time budget in seconds across all attempts
+                     and waits; no retry starts that could not finish in
+                     time. None means no budget.
+    :param retry_if: Classifies an exception as retryable (see is_retryable).
+    :param breaker: A CircuitBreaker consulted before every attempt, or None.
+    :param metrics: A RetryMetrics to count calls, retries and failures in.
+    """
+
+    def decorator(func):
+        name = func.__qualname__
+
+        def before_attempt():
+            if breaker is not None:
+                try:
+                    breaker.before_call()
+                except CircuitOpenError:
+                    metrics.add(name, short_circuited=1)
+                    raise
+
+        def succeeded():
+            if breaker is not None:
+                breaker.record_success()
+            metrics.add(name, successes=1)
+
+        def aborted():
+            # KeyboardInterrupt, cancellation and the like say nothing about
+            # the database, but must not leave a trial call pending
+            if breaker is not None:
+                breaker.record_aborted()
+
+        def backoff_after(error, attempt, started):
+            """
+            Records a failed attempt and returns how long to wait before the
+            next one, or None if the error should propagate now.
+            """
+            if breaker is not None:
+                # Any other error still proves the database answered
+                if is_outage(error):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if not retry_if(error):
+                metrics.add(name, failures=1, not_retryable=1)
+                emit(f"RETRY: {type(error).__name__} is not retryable: {error}")
+                return None
+            if attempt == retries - 1:
+                metrics.add(name, failures=1, exhausted=1)
+                emit(
+                    f"RETRY: Attempt {attempt + 1}/{retries} failed. "
+                    "All retries exhausted."
+                )
+                return None
+
+            wait = backoff_delay(attempt, delay, max_delay)
+            if deadline is not None:
+                remaining = deadline - (time.monotonic() - started)
+                if wait >= remaining:
+                    metrics.add(name, failures=1, deadline_exceeded=1)
+                    emit(
+                        f"RETRY: Attempt {attempt + 1}/{retries} failed and "
+                        f"the {deadline}s deadline leaves no time to retry."
+                    )
+                    return None
+            emit(
+                f"RETRY: Attempt {attempt + 1}/{retries} failed: {error}. "
+                f"Retrying in {wait:.2f} second(s)..."
+            )
+            metrics.add(name, retries=1, backoff_ms=round(wait * 1000))
+            return wait
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.monotonic()
+                metrics.add(name, calls=1)
+                for attempt in range(retries):
+                    before_attempt()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        wait = backoff_after(e, attempt, started)
+                        if wait is None:
+                            raise
+                        await asyncio.sleep(wait)
+                    except BaseException:
+                        aborted()
+                        raise
+                    else:
+                        succeeded()
+                        return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            metrics.add(name, calls=1)
+            for attempt in range(retries):
+                before_attempt()
+                try:
+                    # Attempt to execute the decorated function
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    wait = backoff_after(e, attempt, started)
+                    if wait is None:
+                        raise
+                    time.sleep(wait)
+                except BaseException:
+                    aborted()
+                    raise
+                else:
+                    succeeded()
+                    return result
+
+        return wrapper
+
+    return decorator
+
+
+#### ---- TABLE TAGS ---- ####
+# Tag of results whose tables cannot be told from the query: a write to any
+# table drops them. A write whose table cannot be told drops every result.
+ALL_TABLES = "*"
+
+# SQL split into string literals and comments (skipped), quoted
+# identifiers, bare words and single punctuation characters
+_SQL_TOKEN = re.compile(
+    r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/"
+    r'|`([^`]*)`|"([^"]*)"|\[([^\]]*)\]|(\w+)|(\S)',
+    re.DOTALL,
+)
+# Keywords that end a FROM list (or show a parenthesis holds a subquery)
+_FROM_LIST_ENDS = frozenset(
+    "select values where group having window order limit union except "
+    "intersect returning set".split()
+)
+_NAME = r'(?:`[^`]*`|"[^"]*"|\[[^\]]*\]|\w+)'
+_WRITE_TABLE = re.compile(
+    rf"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO"
+    rf"|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM"
+    rf"|(?:DROP|ALTER)\s+TABLE(?:\s+IF\s+EXISTS)?)\s+(?:{_NAME}\s*\.\s*)?({_NAME})",
+    re.IGNORECASE,
+)
+_WRITE = re.compile(
+    r"^\s*(?:INSERT|REPLACE|UPDATE|DELETE|DROP|ALTER)\b"
+    r"|^\s*WITH\b.*\b(?:INSERT|REPLACE|UPDATE|DELETE)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def tables_read_by(query):
+    """
+    Returns the (lower-cased) tables a SELECT reads from: every entry of
+    each FROM list, whether comma-separated or joined, without its schema
+    name (main.users -> users). Subqueries are read the same way. If a FROM
+    list names something else, e.g. a table-valued function, the result is
+    {ALL_TABLES}.
+    """
+    tables = set()
+    # Per parenthesis level: [inside a FROM list, expecting a table name]
+    levels = [[False, False]]
+    name = None  # A table name just read; a "." or "(" may still follow
+    previous_word = None
+    for match in _SQL_TOKEN.finditer(query):
+        kind = match.lastindex
+        if kind is None:
+            continue  # A string literal or a comment
+        token = match.group(kind)
+        level = levels[-1]
+
+        if kind == 5:  # Punctuation
+            previous_word = None
+            if name is not None and token == ".":
+                name, level[1] = None, True  # A schema name; the table follows
+                continue
+            if name is not None and token == "(":
+                return {ALL_TABLES}  # A table-valued function
+            if name is not None:
+                tables.add(name)
+                name = None
+            if token == "(":
+                # In a table position: a subquery or a parenthesized join
+                opens_list = level[0] and level[1]
+                level[1] = False
+                levels.append([opens_list, opens_list])
+            elif token == ")":
+                if len(levels) > 1:
+                    levels.pop()
+            elif token == "," and level[0]:
+                level[1] = True
+            continue
+
+        if name is not None:
+            tables.add(name)
+            name = None
+        word = token.lower()
+        if kind == 4 and word in ("from", "join") and previous_word != "distinct":
+            level[0] = level[1] = True
+        elif kind == 4 and word in _FROM_LIST_ENDS:
+            level[0] = level[1] = False
+        elif level[1]:
+            name, level[1] = word, False
+        previous_word = word if kind == 4 else None
+
+    if name is not None:
+        tables.add(name)
+    return tables
+
+
+def tables_written_by(statement):
+    """
+    Returns the (lower-cased) table a write statement changes: none for a
+    read, and {ALL_TABLES} for a write whose table cannot be told.
+    """
+    match = _WRITE_TABLE.match(statement)
+    if match:
+        return {match.group(1).strip('`"[]').lower()}
+    return {ALL_TABLES} if _WRITE.match(statement) else set()
+
+
+#### ---- QUERY CACHE ---- ####
+def approximate_size(value):
+    """
+    Estimates the memory held by a query result in bytes: the container
+    plus its rows and their values, as reported by sys.getsizeof.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(
+            approximate_size(k) + approximate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(approximate_size(item) for item in value)
+    return size
+
+
+class QueryCache:
+    """
+    A thread-safe LRU cache of query results.
+
+    Entries are evicted least recently used first once there are more than
+    max_entries of them or their approximate size exceeds max_bytes, and
+    expire ttl seconds after they were stored. Expired entries are kept
+    for another stale_ttl seconds so stale-while-revalidate callers can
+    still be served while a refresh runs. Each entry is tagged with the
+    tables its query reads, so a write to a table drops exactly the
+    results that depend on it. No operation does I/O, so it is safe to use
+    from an event loop.
+    """
+
+    def __init__(
+        self, max_entries=256, max_bytes=8 * 1024 * 1024, ttl=300.0, stale_ttl=60.0
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires_at, tables)
+        self._by_table = {}  # table -> keys of the entries that read it
+        self._bytes = 0
+        self._lock = threading.RLock()
+        # Bumped by every invalidation, so a result computed before a write
+        # is not stored after it
+        self.generation = 0
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def lookup(self, key, allow_stale=False):
+        """
+        Looks up a key, optionally accepting an expired (stale) entry.
+
+        :return: ("fresh", value), ("stale", value) or (None, None).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and entry[2] + self.stale_ttl <= now:
+                self._remove(key)
+                entry = None
+            if entry is None or (entry[2] <= now and not allow_stale):
+                self.stats["misses"] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if entry[2] <= now:
+                self.stats["stale_hits"] += 1
+                return "stale", entry[0]
+            self.stats["hits"] += 1
+            return "fresh", entry[0]
+
+    def get(self, key):
+        """
+        Looks up a key.
+
+        :return: (True, value) on a hit, (False, None) on a miss.
+        """
+        state, value = self.lookup(key)
+        return state is not None, value
+
+    def set(self, key, value, tables=(), ttl=None, generation=None):
+        """
+        Stores a result tagged with the tables it was read from.
+
+        :param ttl: Seconds until the entry expires; defaults to the
+                    cache's ttl.
+        :param generation: The cache generation read before the result was
+                           computed; the result is dropped if an
+                           invalidation happened since.
+        """
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tables = frozenset(tables)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, tables)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate_tables(self, tables):
+        """
+        Drops every entry that reads from any of the given tables, and the
+        entries tagged ALL_TABLES. Passing ALL_TABLES drops every entry.
+
+        :return: The number of entries dropped.
+        """
+        tables = {table.lower() for table in tables}
+        with self._lock:
+            if ALL_TABLES in tables:
+                keys = set(self._entries)
+            else:
+                keys = set(self._by_table.get(ALL_TABLES, ()))
+                for table in tables:
+                    keys |= self._by_table.get(table, set())
+            for key in keys:
+                self._remove(key)
+            self.generation += 1
+            self.stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+            self.generation += 1
+
+    def _remove(self, key):
+        value, size, expires_at, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table[table]
+            keys.discard(key)
+            if not keys:
+                del self._by_table[table]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (
+            f"QueryCache({len(self._entries)} entries, {self._bytes} bytes, "
+            f"stats={self.stats})"
+        )
+
+
+# Global cache shared by every @cache_query function
+query_cache = QueryCache()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent computations of the same key: the first caller
+    (the leader) runs the function, later callers wait for its result
+    instead of running it again.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in flight
+
+    def _begin(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = self._Call()
+            return call, True
+
+    def _run(self, key, call, fn):
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def do(self, key, fn):
+        """
+        Runs fn() once for all concurrent callers with the same key.
+
+        :return: (result, shared) where shared is True if this caller
+                 waited for another caller's computation.
+        :raises: Whatever fn() raised, in the leader and every waiter.
+        """
+        call, leader = self._begin(key)
+        if leader:
+            self._run(key, call, fn)
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result, not leader
+
+    def do_in_background(self, key, fn):
+        """
+        Starts fn() on a background thread unless the key is already in
+        flight.
+
+        :return: True if a new computation was started.
+        """
+        call, leader = self._begin(key)
+        if leader:
+            thread = threading.Thread(target=self._run, args=(key, call, fn))
+            thread.daemon = True
+            thread.start()
+        return leader
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines, per event loop. The leader's coroutine runs
+    in a task of its own rather than in the leader, so cancelling any one
+    caller, the leader included, never cancels it for the others.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # (event loop, key) -> task in flight
+
+    def _begin(self, key, fn):
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        task = self._tasks.get(flight_key)
+        if task is not None:
+            return task, False
+        task = self._tasks[flight_key] = loop.create_task(fn())
+        task.add_done_callback(functools.partial(self._finish, flight_key))
+        return task, True
+
+    def _finish(self, flight_key, task):
+        del self._tasks[flight_key]
+        # Mark the outcome as retrieved even if every caller stopped waiting
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, fn):
+        """
+        Awaits fn() once for all concurrent callers with the same key.
+
+        :return: (result, shared) where shared is True if this caller
+                 waited for another caller's computation.
+        :raises: Whatever fn() raised, in every caller still waiting.
+        """
+        task, leader = self._begin(key, fn)
+        # shield: a cancelled caller stops waiting; the computation goes on
+        return await asyncio.shield(task), not leader
+
+    def do_in_background(self, key, fn):
+        """
+        Starts fn() in a task unless the key is already in flight.
+
+        :return: True if a new computation was started.
+        """
+        return self._begin(key, fn)[1]
+
+
+# Computations in flight, shared by every @cache_query function
+in_flight = SingleFlight()
+async_in_flight = AsyncSingleFlight()
+
+
+class SQLiteCacheStore:
+    """
+    A second-tier (L2) cache shared by every process on the host, kept in
+    a SQLite file in WAL mode. Results are pickled, so share the file only
+    between processes of the same application.
+
+    Writes bump a per-table generation number. Each process polls these
+    generations at most every sync_interval seconds and drops its own
+    in-process (L1) entries for the tables written by other processes.
+    """
+
+    def __init__(self, path, max_entries=10_000, sync_interval=1.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval
+        self._local = threading.local()  # One connection per thread
+        self._lock = threading.Lock()
+        self._seen = None  # table -> generation as of the last sync
+        self._last_sync = 0.0
+        self._writes = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "invalidations": 0}
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                table_name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (table_name, key)
+            );
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                table_name TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL
+            );
+            """
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; multi-statement writes use BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(key):
+        return hashlib.sha256(pickle.dumps(key)).hexdigest()
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def get(self, key):
+        """
+        Looks up a key.
+
+        :return: (True, value, expires_at) on a hit, where expires_at is a
+                 time.time() timestamp, or (False, None, None) on a miss.
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value, expires_at FROM cache_entries "
+                "WHERE key = ? AND expires_at > ?",
+                (self._key(key), time.time()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            self._count("misses")
+            return False, None, None
+        self._count("hits")
+        return True, pickle.loads(row[0]), row[1]
+
+    def _stored_generations(self, tables):
+        """Returns the stored generation of each table (0 if never written)."""
+        conn = self._connection()
+        return {
+            table: (
+                conn.execute(
+                    "SELECT generation FROM cache_generations WHERE table_name = ?",
+                    (table,),
+                ).fetchone()
+                or (0,)
+            )[0]
+            for table in tables
+        }
+
+    def generations(self, tables):
+        """
+        Returns the current generation of each table (0 if never written).
+        That of ALL_TABLES is the sum of all of them, so it moves on every
+        write, like the results tagged with it are dropped on every write.
+        """
+        current = self._stored_generations(
+            [table for table in tables if table != ALL_TABLES]
+        )
+        if ALL_TABLES in tables:
+            current[ALL_TABLES] = (
+                self._connection()
+                .execute("SELECT COALESCE(SUM(generation), 0) FROM cache_generations")
+                .fetchone()[0]
+            )
+        return current
+
+    def set(self, key, value, tables=(), ttl=300.0, generations=None):
+        """
+        Stores a result tagged with the tables it was read from.
+
+        :param generations: The table generations read before the result
+                            was computed; the result is dropped if any of
+                            the tables has been written since.
+        """
+        conn = self._connection()
+        hashed = self._key(key)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if generations is not None and self.generations(generations) != generations:
+                conn.execute("ROLLBACK")
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?)",
+                (
+                    hashed,
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                    time.time() + ttl,
+                ),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags VALUES (?, ?)",
+                [(table, hashed) for table in tables],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("writes")
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Deletes expired entries, then the soonest-expiring ones over max_entries."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),)
+            )
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "  SELECT key FROM cache_entries ORDER BY expires_at DESC"
+                "  LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            conn.execute(
+                "DELETE FROM cache_tags "
+                "WHERE key NOT IN (SELECT key FROM cache_entries)"
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def invalidate_tables(self, tables):
+        """
+        Drops every entry that reads from any of the given tables (and those
+        tagged ALL_TABLES) and bumps their generations so other processes
+        drop their L1 copies. Passing ALL_TABLES drops every entry and
+        bumps every generation, as if each table had been written.
+
+        :return: The number of entries dropped.
+        """
+        conn = self._connection()
+        tables = sorted({table.lower() for table in tables})
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if ALL_TABLES in tables:
+                dropped = conn.execute("DELETE FROM cache_entries").rowcount
+                conn.execute("DELETE FROM cache_tags")
+                conn.execute(
+                    "INSERT OR IGNORE INTO cache_generations VALUES (?, 0)",
+                    (ALL_TABLES,),
+                )
+                conn.execute("UPDATE cache_generations SET generation = generation + 1")
+                tables = [
+                    name
+                    for (name,) in conn.execute(
+                        "SELECT table_name FROM cache_generations"
+                    )
+                ]
+            else:
+                dropped = 0
+                for table in [*tables, ALL_TABLES]:
+                    dropped += conn.execute(
+                        "DELETE FROM cache_entries WHERE key IN "
+                        "(SELECT key FROM cache_tags WHERE table_name = ?)",
+                        (table,),
+                    ).rowcount
+                    conn.execute(
+                        "DELETE FROM cache_tags WHERE table_name = ?", (table,)
+                    )
+                for table in tables:
+                    conn.execute(
+                        "INSERT INTO cache_generations VALUES (?, 1) "
+                        "ON CONFLICT(table_name) "
+                        "DO UPDATE SET generation = generation + 1",
+                        (table,),
+                    )
+            current = self._stored_generations(tables)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            # This process already invalidated its own L1 for these tables
+            if self._seen is not None:
+                self._seen.update(current)
+            self.stats["invalidations"] += dropped
+        return dropped
+
+    def changed_tables(self):
+        """
+        Returns the tables written through other processes since the last
+        call. Polls at most every sync_interval seconds; returns an empty
+        set in between.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sync < self.sync_interval:
+                return set()
+            self._last_sync = now
+        current = dict(
+            self._connection().execute(
+                "SELECT table_name, generation FROM cache_generations"
+            )
+        )
+        with self._lock:
+            seen, self._seen = self._seen, current
+        if seen is None:
+            return set()
+        return {table for table, gen in current.items() if seen.get(table) != gen}
+
+    def close(self):
+        """Closes this thread's connection to the store."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# The shared second tier behind query_cache, e.g. a SQLiteCacheStore. Any
+# object with the same get/set/generations/invalidate_tables/changed_tables
+# methods can be plugged in here; None (the default) caches in-process only.
+l2_cache = None
+
+
+def cache_stats():
+    """Returns the hit/miss counters of each cache tier."""
+    stats = {"l1": dict(query_cache.stats)}
+    if l2_cache is not None:
+        stats["l2"] = dict(l2_cache.stats)
+    return stats
+
+
+def make_cache_key(query, params):
+    """
+    Builds a cache key from the query text (whitespace-normalized) and its
+    parameters, so the same SQL with different parameters is cached apart.
+    """
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    elif params is not None:
+        params = tuple(params)
+    return " ".join(query.split()), params
+
+
+def find_params(args, kwargs, query):
+    """Returns the parameters passed as `params` or right after the query."""
+    if "params" in kwargs:
+        return kwargs["params"]
+    if query in args:
+        position = args.index(query) + 1
+        if position < len(args):
+            return args[position]
+    return None
+
+
+def sync_with_l2():
+    """Drops local results for tables that other processes have written."""
+    if l2_cache is not None:
+        changed = l2_cache.changed_tables()
+        if changed:
+            query_cache.invalidate_tables(changed)
+
+
+def cache_query(
+    func=None, *, ttl=None, tables=None, stale_while_revalidate=False, connect=None
+):
+    """
+    A decorator that caches the result of a database query function in
+    query_cache (and l2_cache, if one is set). The cache key is the SQL
+    query string plus its parameters, passed as `query` and `params` (or
+    positionally, after the connection). Functions without a query
+    argument are keyed by their other arguments and need `tables`.
+
+    Concurrent misses for the same key run the query once; the other
+    callers wait for that result (for coroutine functions, they await
+    one task). Use it bare (@cache_query) or with options
+    (@cache_query(ttl=30, stale_while_revalidate=True)). Put it outside
+    with_db_connection so hits never open or borrow a connection.
+
+    :param ttl: Seconds a result stays fresh; defaults to the cache's ttl.
+    :param tables: The tables the results read from, so transactional can
+                   invalidate them; by default parsed from the query.
+    :param stale_while_revalidate: Serve an expired result immediately and
+                                   refresh it once in the background.
+    :param connect: Opens the connection used by background refreshes of
+                    functions that take one (the caller's is closed by
+                    then); defaults to sqlite_profiles.connect(DB_FILE),
+                    or connect_async for coroutine functions, whose
+                    connect must return an awaitable.
+    """
+    if func is None:
+        return functools.partial(
+            cache_query,
+            ttl=ttl,
+            tables=tables,
+            stale_while_revalidate=stale_while_revalidate,
+            connect=connect,
+        )
+
+    def plan(args, kwargs):
+        """Returns (key, label, tables) for a call, or None to run it uncached."""
+        query = find_query(args, kwargs)
+        if query:
+            key = make_cache_key(query, find_params(args, kwargs, query))
+            return key, query, tables_read_by(query) if tables is None else tables
+        if tables is None:
+            return None  # Cannot tell which writes would make it stale
+        args = tuple(arg for arg in args if not _is_connection(arg))
+        key = func.__qualname__, args, tuple(sorted(kwargs.items()))
+        return key, func.__qualname__, tables
+
+    def store(key, result, tags, generation):
+        query_cache.set(key, result, tables=tags, ttl=ttl, generation=generation)
+
+    def l2_ttl():
+        return query_cache.ttl if ttl is None else ttl
+
+    def takes_connection(args):
+        return bool(args) and _is_connection(args[0])
+
+    if inspect.iscoroutinefunction(func):
+
+        async def load_async(key, label, tags, call):
+            """load() for coroutine functions, with the L2 I/O on a thread."""
+            l2 = l2_cache
+            generation = query_cache.generation
+            l2_generations = None
+            if l2 is not None:
+                hit, result, expires_at = await asyncio.to_thread(l2.get, key)
+                if hit:
+                    emit(
+                        f'CACHE HIT (L2): Returning shared result for query: "{label}"'
+                    )
+                    query_cache.set(
+                        key,
+                        result,
+                        tables=tags,
+                        ttl=expires_at - time.time(),
+                        generation=generation,
+                    )
+                    return result
+                l2_generations = await asyncio.to_thread(l2.generations, tags)
+
+            emit(f'CACHE MISS: Executing query and caching result for: "{label}"')
+            result = await call()
+            store(key, result, tags, generation)
+            if l2 is not None:
+                await asyncio.to_thread(
+                    l2.set, key, result, tags, l2_ttl(), l2_generations
+                )
+            return result
+
+        async def refresh_async(args, kwargs):
+            """Re-runs the function, on a connection of its own if it takes one."""
+            try:
+                if not takes_connection(args):
+                    return await func(*args, **kwargs)
+                conn = await (
+                    connect() if connect else sqlite_profiles.connect_async(DB_FILE)
+                )
+                try:
+                    return await func(conn, *args[1:], **kwargs)
+                finally:
+                    await conn.close()
+            except Exception as e:
+                emit(f"CACHE REFRESH: Failed, keeping the stale result. Error: {e}")
+                raise
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            planned = plan(args, kwargs)
+            if planned is None:
+                return await func(*args, **kwargs)
+            key, label, tags = planned
+
+            # At most one small read every sync_interval; not worth a thread
+            sync_with_l2()
+            state, result = query_cache.lookup(key, allow_stale=stale_while_revalidate)
+            if state == "fresh":
+                emit(f'CACHE HIT: Returning cached result for query: "{label}"')
+                return result
+            if state == "stale":
+                emit(f'CACHE STALE: Returning old result, refreshing: "{label}"')
+                async_in_flight.do_in_background(
+                    key,
+                    lambda: load_async(
+                        key, label, tags, lambda: refresh_async(args, kwargs)
+                    ),
+                )
+                return result
+
+            # If not in L1, load it once for all waiting callers
+            result, shared = await async_in_flight.do(
+                key, lambda: load_async(key, label, tags, lambda: func(*args, **kwargs))
+            )
+            if shared:
+                emit(f'CACHE WAIT: Shared the in-flight result for: "{label}"')
+            return result
+
+        return async_wrapper
+
+    def load(key, label, tags, call):
+        """
+        Fills L1 from the shared L2 tier if it has the result; otherwise
+        runs the query and stores the result in both tiers, unless a write
+        raced it.
+        """
+        l2 = l2_cache
+        generation = query_cache.generation
+        l2_generations = None
+        if l2 is not None:
+            hit, result, expires_at = l2.get(key)
+            if hit:
+                emit(f'CACHE HIT (L2): Returning shared result for query: "{label}"')
+                query_cache.set(
+                    key,
+                    result,
+                    tables=tags,
+                    ttl=expires_at - time.time(),
+                    generation=generation,
+                )
+                return result
+            l2_generations = l2.generations(tags)
+
+        emit(f'CACHE MISS: Executing query and caching result for: "{label}"')
+        result = call()
+        store(key, result, tags, generation)
+        if l2 is not None:
+            l2.set(key, result, tags, l2_ttl(), l2_generations)
+        return result
+
+    def refresh(args, kwargs):
+        """Re-runs the function, on a connection of its own if it takes one."""
+        try:
+            if not takes_connection(args):
+                return func(*args, **kwargs)
+            conn = connect() if connect else sqlite_profiles.connect(DB_FILE)
+            try:
+                return func(conn, *args[1:], **kwargs)
+            finally:
+                conn.close()
+        except Exception as e:
+            emit(f"CACHE REFRESH: Failed, keeping the stale result. Error: {e}")
+            raise
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        planned = plan(args, kwargs)
+        if planned is None:
+            # Cannot cache without a key, execute directly
+            return func(*args, **kwargs)
+        key, label, tags = planned
+
+        sync_with_l2()
+        state, result = query_cache.lookup(key, allow_stale=stale_while_revalidate)
+        if state == "fresh":
+            emit(f'CACHE HIT: Returning cached result for query: "{label}"')
+            return result
+        if state == "stale":
+            emit(f'CACHE STALE: Returning old result, refreshing: "{label}"')
+            in_flight.do_in_background(
+                key, lambda: load(key, label, tags, lambda: refresh(args, kwargs))
+            )
+            return result
+
+        # If not in L1, load it once for all waiting callers
+        result, shared = in_flight.do(
+            key, lambda: load(key, label, tags, lambda: func(*args, **kwargs))
+        )
+        if shared:
+            emit(f'CACHE WAIT: Shared the in-flight result for: "{label}"')
+        return result
+
+    return wrapper
+
+
+#### ---- TRANSACTIONS ---- ####
+# The trace callback currently installed on each connection. Neither sqlite3
+# nor aiosqlite has a getter for it, so tracers are installed through
+# set_trace_callback below to let transactional chain to them instead of
+# replacing them.
+_trace_callbacks = {}
+
+
+def set_trace_callback(conn, callback):
+    """
+    Installs (or, with None, removes) a statement trace callback on a
+    connection. Use this instead of conn.set_trace_callback so the
+    callback keeps running while transactional records statements. For an
+    aiosqlite connection, await the result.
+    """
+    if callback is None:
+        _trace_callbacks.pop(conn, None)
+    else:
+        _trace_callbacks[conn] = callback
+    return conn.set_trace_callback(callback)
+
+
+def transactional(func):
+    """
+    Decorator that wraps a function in a database transaction.
+    Commits if the function succeeds, rolls back if it fails. After a
+    commit, cached results that read from the tables it wrote are dropped.
+    """
+
+    def recording_tracer(conn, statements):
+        """Returns (tracer, previous callback): a tracer that records and chains."""
+        previous = _trace_callbacks.get(conn)
+
+        # Record every statement the function runs to learn what it wrote,
+        # passing each one on to any tracer that was already installed
+        def trace(statement):
+            statements.append(statement)
+            if previous is not None:
+                previous(statement)
+
+        return trace, previous
+
+    def written_by(statements):
+        written = set()
+        for statement in statements:
+            written |= tables_written_by(statement)
+        return written
+
+    def report(written, dropped):
+        emit(
+            f"TRANSACTION: Committed writes to {sorted(written)}; "
+            f"invalidated {dropped} cached result(s)."
+        )
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            statements = []
+            trace, previous = recording_tracer(conn, statements)
+            await set_trace_callback(conn, trace)
+            try:
+                result = await func(conn, *args, **kwargs)
+            except Exception as e:
+                emit(f"TRANSACTION: An error occurred. Rolling back... Error: {e}")
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
+                written = written_by(statements)
+                if written:
+                    dropped = query_cache.invalidate_tables(written)
+                    l2 = l2_cache
+                    if l2 is not None:
+                        await asyncio.to_thread(l2.invalidate_tables, written)
+                    report(written, dropped)
+            finally:
+                await set_trace_callback(conn, previous)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        statements = []
+        trace, previous = recording_tracer(conn, statements)
+        set_trace_callback(conn, trace)
+        try:
+            result = func(conn, *args, **kwargs)
+        except Exception as e:
+            emit(f"TRANSACTION: An error occurred. Rolling back... Error: {e}")
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+            written = written_by(statements)
+            if written:
+                dropped = query_cache.invalidate_tables(written)
+                if l2_cache is not None:
+                    l2_cache.invalidate_tables(written)
+                report(written, dropped)
+        finally:
+            set_trace_callback(conn, previous)
+        return result
+
+    return wrapper
@@ -0,0 +1,229 @@
+import atexit
+import os
+import sqlite3
+import tempfile
+import time
+
+try:
+    import aiosqlite
+except ImportError:  # Only needed by connect_async
+    aiosqlite = None
+
+# --- PERFORMANCE PROFILES ---
+# PRAGMAs of each profile. "default" keeps SQLite's own settings (rollback
+# journal, fsync on every commit, small page cache, no memory mapping) for
+# comparison. No profile sets busy_timeout: sqlite3.connect already waits
+# up to its `timeout` argument (5 seconds by default) for a lock.
+PROFILES = {
+    "default": {},
+    # WAL with a full fsync on every commit: readers never block the writer
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+    },
+    # WAL with fsync only at checkpoints: a power loss can drop the last
+    # commits but never corrupts the database; an application crash loses
+    # nothing
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # Negative: in KiB, i.e. 64 MiB
+        "temp_store": "MEMORY",
+    },
+}
+
+# PRAGMAs stored in the database file itself. prepare_database() sets them
+# once; connect() only applies the rest, which last for one connection.
+PERSISTENT_PRAGMAS = ("journal_mode",)
+
+# Absolute database path -> the connection prepare_database() keeps open
+_held_connections = {}
+
+# The profile used when connect() is not given one
+DEFAULT_PROFILE = os.getenv("SQLITE_PROFILE", "fast")
+
+# Compiled statements kept per connection, keyed by SQL text, so repeated
+# queries skip parsing and planning (sqlite3's own default is 128)
+CACHED_STATEMENTS = 512
+
+
+def profile_pragmas(profile=None, persistent=False):
+    """
+    Returns the PRAGMA statements of a profile.
+
+    Args:
+        profile (str | dict): A name from PROFILES or a dict of PRAGMAs;
+                              defaults to DEFAULT_PROFILE.
+        persistent (bool): Return the PERSISTENT_PRAGMAS instead of the
+                           per-connection ones.
+
+    Raises:
+        ValueError: If the profile name is unknown.
+    """
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, str):
+        try:
+            profile = PROFILES[profile]
+        except KeyError:
+            raise ValueError(f"Unknown SQLite profile: {profile!r}") from None
+    return [
+        f"PRAGMA {name} = {value}"
+        for name, value in profile.items()
+        if (name in PERSISTENT_PRAGMAS) == persistent
+    ]
+
+
+def apply_profile(conn, profile=None):
+    """Applies a profile's per-connection PRAGMAs to an open sqlite3 connection."""
+    for pragma in profile_pragmas(profile):
+        conn.execute(pragma)
+    return conn
+
+
+def prepare_database(database, profile=None):
+    """
+    Applies a profile's persistent PRAGMAs (the journal mode) to a database
+    file. Run it once when the database is created, not per connection.
+
+    For a WAL database one connection is kept open until close_database()
+    (or exit). When the last connection to a WAL database closes, SQLite
+    checkpoints and deletes the WAL and shared-memory files, and the next
+    open rebuilds them. With this connection held, per-call connections
+    never trigger that, so opening one costs about as much as it does
+    with a rollback journal.
+    """
+    close_database(database)
+    conn = sqlite3.connect(database, check_same_thread=False)
+    try:
+        for pragma in profile_pragmas(profile, persistent=True):
+            conn.execute(pragma)
+        (journal_mode,) = conn.execute("PRAGMA journal_mode").fetchone()
+    except BaseException:
+        conn.close()
+        raise
+    if journal_mode.lower() == "wal":
+        # Switching the mode does not open the WAL; the first read does
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        _held_connections[os.path.abspath(database)] = conn
+    else:
+        conn.close()
+
+
+def close_database(database):
+    """
+    Closes the connection prepare_database() holds for a database, if any.
+    If no other connection is open, SQLite checkpoints the WAL and removes
+    the -wal and -shm files.
+    """
+    conn = _held_connections.pop(os.path.abspath(database), None)
+    if conn is not None:
+        conn.close()
+
+
+def remove_database(database):
+    """Deletes a database file along with its WAL and shared-memory files."""
+    close_database(database)
+    for path in (database, f"{database}-wal", f"{database}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@atexit.register
+def _close_held_connections():
+    for database in list(_held_connections):
+        close_database(database)
+
+
+def connect(database, profile=None, **kwargs):
+    """
+    Opens a sqlite3 connection with a profile's per-connection PRAGMAs
+    applied and a larger statement cache. Accepts the same keyword
+    arguments as sqlite3.connect (e.g. isolation_level, check_same_thread).
+    The journal mode is left to prepare_database().
+
+    Args:
+        database (str): The database file.
+        profile (str | dict): See profile_pragmas.
+    """
+    kwargs.setdefault("cached_statements", CACHED_STATEMENTS)
+    return apply_profile(sqlite3.connect(database, **kwargs), profile)
+
+
+async def connect_async(database, profile=None, **kwargs):
+    """
+    The aiosqlite counterpart of connect(): same PRAGMAs, same statement
+    cache, for code running on an event loop.
+
+    Raises:
+        RuntimeError: If aiosqlite is not installed.
+    """
+    if aiosqlite is None:
+        raise RuntimeError("connect_async requires aiosqlite.")
+    kwargs.setdefault("cached_statements", CACHED_STATEMENTS)
+    conn = await aiosqlite.connect(database, **kwargs)
+    try:
+        for pragma in profile_pragmas(profile):
+            await conn.execute(pragma)
+    except BaseException:
+        await conn.close()
+        raise
+    return conn
+
+
+# --- BENCHMARK ---
+def benchmark_profile(profile, rows=2_000, reads=20_000, connects=2_000):
+    """
+    Measures small-transaction write throughput, point-read throughput and
+    connection-per-call throughput (open, one read, close) on a fresh
+    database file.
+
+    Returns:
+        tuple: (writes per second, reads per second, connects per second)
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database = os.path.join(temp_dir, "bench.db")
+        prepare_database(database, profile)
+        conn = connect(database, profile)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+
+        # One commit per insert, the way the decorators write
+        start = time.perf_counter()
+        for i in range(rows):
+            conn.execute("INSERT INTO users (name) VALUES (?)", (f"User {i}",))
+            conn.commit()
+        writes = rows / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(reads):
+            conn.execute(
+                "SELECT name FROM users WHERE id = ?", (i % rows + 1,)
+            ).fetchone()
+        reads_per_second = reads / (time.perf_counter() - start)
+        conn.close()
+
+        # The way the per-call decorators use connections
+        start = time.perf_counter()
+        for i in range(connects):
+            conn = connect(database, profile)
+            conn.execute(
+                "SELECT name FROM users WHERE id = ?", (i % rows + 1,)
+            ).fetchone()
+            conn.close()
+        connects_per_second = connects / (time.perf_counter() - start)
+        close_database(database)
+    return writes, reads_per_second, connects_per_second
+
+
+def main():
+    """Prints read, write and connect throughput under each profile."""
+    print(f"{'profile':>10} {'writes/s':>12} {'reads/s':>12} {'connects/s':>12}")
+    for name in PROFILES:
+        writes, reads, connects = benchmark_profile(name)
+        print(f"{name:>10} {writes:>12,.0f} {reads:>12,.0f} {connects:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,100 @@
-import mysql.connector
 import time
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# --- DATABASE BACKEND ---
+# MySQL or SQLite, selected by DB_BACKEND (see backends.py)
+backend = __import__("backends").get_backend()
 
-# --- DATABASE CONFIGURATION ---
-DB_CONFIG = {
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "database": os.getenv("DB_NAME"),
-}
+# --- FETCH BLOCK AUTO-TUNING ---
+# Bounds for the number of rows pulled per fetchmany() call
+MIN_ARRAYSIZE = 16
+MAX_ARRAYSIZE = 50_000
+# Aim for blocks of roughly this many bytes...
+TARGET_BLOCK_BYTES = 256 * 1024
+# ...without holding the consumer up for longer than this per fetch
+TARGET_BLOCK_SECONDS = 0.05
 
 
-def stream_users():
+def tune_arraysize(arraysize, block, elapsed):
+    """
+    Picks the next fetchmany() size from the last block's row width and
+    fetch latency.
+
+    Args:
+        arraysize (int): The size used for the last fetch.
+        block (list): The rows that fetch returned.
+        elapsed (float): How long that fetch took, in seconds.
+
+    Returns:
+        int: The size to use for the next fetch.
+    """
+    # Estimate the row width from the first row; cheap and close enough
+    row_bytes = max(sum(len(str(value)) for value in block[0]), 1)
+    by_width = TARGET_BLOCK_BYTES // row_bytes
+
+    if elapsed > 0:
+        by_latency = int(len(block) * TARGET_BLOCK_SECONDS / elapsed)
+    else:
+        by_latency = arraysize * 2
+
+    # Grow at most 2x per step so one fast fetch cannot overshoot badly
+    proposed = min(by_width, by_latency, arraysize * 2)
+    return max(MIN_ARRAYSIZE, min(proposed, MAX_ARRAYSIZE))
+
+
+def stream_users(arraysize: int = None, auto_tune: bool = False):
     """
     A generator that connects to the database and streams rows one by one
     using a server-side cursor.
+
+    Rows are still yielded one at a time, but with an arraysize (or
+    auto_tune) they are pulled from the driver in blocks via fetchmany(),
+    which cuts the per-row overhead of walking the cursor.
+
+    Args:
+        arraysize (int): Rows per fetchmany() block. None keeps the plain
+                         row-by-row cursor iteration.
+        auto_tune (bool): Adjust the block size after every fetch from the
+                          measured row width and fetch latency, starting
+                          from arraysize (or MIN_ARRAYSIZE).
     """
     connection = None
     try:
         # Establish connection
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = backend.connect()
 
         print("Connection established. Creating server-side cursor.")
-        # The key to streaming: buffered=False creates a server-side cursor.
+        # The key to streaming: a server-side (unbuffered) cursor.
         # It fetches rows only when requested, not all at once.
-        cursor = connection.cursor(buffered=False)
+        cursor = backend.cursor(connection, streaming=True)
 
         # Execute the query
         query = "SELECT name, email, age FROM user_data ORDER BY name"
         cursor.execute(query)
         print("Query executed. Starting to stream rows...")
 
-        # Yield rows one by one
-        for row in cursor:
-            yield row  # 'yield' makes this function a generator
+        if arraysize is None and not auto_tune:
+            # Yield rows one by one
+            for row in cursor:
+                yield row  # 'yield' makes this function a generator
+            return
+
+        block_size = arraysize or MIN_ARRAYSIZE
+        while True:
+            fetch_start = time.perf_counter()
+            block = cursor.fetchmany(block_size)
+            if not block:
+                break
+            if auto_tune:
+                elapsed = time.perf_counter() - fetch_start
+                block_size = tune_arraysize(block_size, block, elapsed)
+            # Hand the block out row by row
+            yield from block
 
-    except mysql.connector.Error as err:
+    except backend.Error as err:
         print(f"Database error: {err}")
     finally:
         # Ensure resources are always released
-        if connection and connection.is_connected():
+        if connection and backend.is_connected(connection):
             cursor.close()
             connection.close()
             print("\nCursor and connection closed.")
@@ -1,36 +1,152 @@
+import json
 import os
-import mysql.connector
-from dotenv import load_dotenv
+import time
+from array import array
+from itertools import compress
 
-load_dotenv()
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; columnar batches fall back to array/list
+    np = None
 
-# --- DATABASE CONFIGURATION ---
-DB_CONFIG = {
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "database": os.getenv("DB_NAME"),
-}
+prefetch = __import__("prefetch").prefetch
+lazy_paginate_keyset = __import__("2-lazy_paginate").lazy_paginate_keyset
 
+# --- DATABASE BACKEND ---
+# MySQL or SQLite, selected by DB_BACKEND (see backends.py)
+backend = __import__("backends").get_backend()
 
-def stream_users_in_batches(batch_size: int = 100):
+# Default state file for resumable_batch_processing
+CHECKPOINT_FILE = "batch_processing.checkpoint.json"
+
+
+class ColumnarBatch:
+    """
+    A batch of users stored column by column instead of as a list of dicts.
+
+    With NumPy installed, user_id, name and email are fixed-width UTF-8 byte
+    arrays and age is a float64 array, so a batch is a handful of compact
+    buffers and filters such as `batch.age > 25` are vectorized masks.
+    Without NumPy, age is an array('d') and the text columns are lists.
+    """
+
+    __slots__ = ("user_id", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds a batch from (user_id, name, email, age) tuples.
+
+        Args:
+            rows (list): Rows as returned by the cursor, with age as a float.
+        """
+        if not rows:
+            user_ids, names, emails, ages = (), (), (), ()
+        else:
+            user_ids, names, emails, ages = zip(*rows)
+
+        if np is None:
+            return cls(list(user_ids), list(names), list(emails), array("d", ages))
+
+        def text_column(values):
+            return np.array([value.encode("utf-8") for value in values], dtype=bytes)
+
+        return cls(
+            text_column(user_ids),
+            text_column(names),
+            text_column(emails),
+            np.array(ages, dtype=np.float64),
+        )
+
+    def __len__(self):
+        return len(self.age)
+
+    def age_above(self, threshold):
+        """
+        Returns a boolean mask of the users older than threshold.
+
+        Args:
+            threshold (float): The exclusive lower age bound.
+        """
+        if np is None:
+            return [age > threshold for age in self.age]
+        return self.age > threshold
+
+    def take(self, mask):
+        """
+        Returns a new batch with only the users where mask is true.
+
+        Args:
+            mask: A boolean mask as returned by age_above (or any NumPy
+                  expression over the columns).
+        """
+        if np is None:
+            return ColumnarBatch(
+                list(compress(self.user_id, mask)),
+                list(compress(self.name, mask)),
+                list(compress(self.email, mask)),
+                array("d", compress(self.age, mask)),
+            )
+        return ColumnarBatch(
+            self.user_id[mask], self.name[mask], self.email[mask], self.age[mask]
+        )
+
+    def rows(self):
+        """Yields the batch back as user dictionaries, e.g. for display."""
+
+        def text(value):
+            return value.decode("utf-8") if isinstance(value, bytes) else value
+
+        for user_id, name, email, age in zip(
+            self.user_id, self.name, self.email, self.age
+        ):
+            yield {
+                "user_id": text(user_id),
+                "name": text(name),
+                "email": text(email),
+                "age": float(age),
+            }
+
+    def nbytes(self):
+        """Approximate memory held by the column buffers, in bytes."""
+        if np is None:
+            return None
+        return sum(
+            column.nbytes for column in (self.user_id, self.name, self.email, self.age)
+        )
+
+
+def stream_users_in_batches(batch_size: int = 100, columnar: bool = False):
     """
     A generator that connects to the database, fetches users, and yields them
     in batches (lists) of a specified size.
 
     Args:
         batch_size (int): The number of rows to include in each batch.
+        columnar (bool): Yield ColumnarBatch objects instead of lists of
+                         dictionaries.
 
     Yields:
-        list: A list of user data dictionaries.
+        list: A list of user data dictionaries (or a ColumnarBatch).
     """
     connection = None
+    cursor = None
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = backend.connect()
         print(f"Connection established. Fetching users in batches of {batch_size}...")
 
+        if columnar:
+            yield from stream_columnar_batches(connection, batch_size)
+            return
+
         # Use a server-side cursor that returns dictionaries
-        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor = backend.cursor(connection, dictionary=True, streaming=True)
 
         query = "SELECT user_id, name, email, age FROM user_data ORDER BY name"
         cursor.execute(query)
@@ -47,26 +163,59 @@ def stream_users_in_batches(batch_size: int = 100):
         if batch:
             yield batch
 
-    except mysql.connector.Error as err:
+    except backend.Error as err:
         print(f"Database error: {err}")
     finally:
-        if connection and connection.is_connected():
-            cursor.close()
+        if connection and backend.is_connected(connection):
+            if cursor is not None:
+                cursor.close()
             connection.close()
             print("\nDatabase connection closed.")
 
 
-def batch_processing(batch_size: int):
+def stream_columnar_batches(connection, batch_size):
+    """
+    Yields ColumnarBatch objects built from fetchmany() blocks on an open
+    connection.
+
+    Args:
+        connection: A backend connection to read from.
+        batch_size (int): The number of rows per batch.
+    """
+    cursor = backend.cursor(connection, streaming=True)
+    try:
+        # Adding a DOUBLE literal makes the server send ages as floats
+        query = "SELECT user_id, name, email, age + 0E0 FROM user_data ORDER BY name"
+        cursor.execute(query)
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield ColumnarBatch.from_rows(rows)
+    finally:
+        cursor.close()
+
+
+def batch_processing(
+    batch_size: int, columnar: bool = False, prefetch_batches: int = 0
+):
     """
     Processes user data in batches, filtering for users over the age of 25.
 
     Args:
         batch_size (int): The size of batches to request from the streamer.
+        columnar (bool): Use columnar batches and a vectorized age filter.
+        prefetch_batches (int): Fetch up to this many batches ahead on a
+                                background thread while the current one is
+                                processed. 0 disables prefetching.
     """
     print("--- Starting Batch Processing ---")
 
     # Get the generator that will stream batches
-    user_batch_generator = stream_users_in_batches(batch_size)
+    user_batch_generator = stream_users_in_batches(batch_size, columnar=columnar)
+    if prefetch_batches:
+        user_batch_generator = prefetch(user_batch_generator, prefetch_batches)
 
     batch_num = 0
     # --- Loop #2: Iterates through each BATCH yielded by the generator ---
@@ -74,8 +223,12 @@ def batch_processing(batch_size: int):
         batch_num += 1
         print(f"\n---> Processing Batch #{batch_num} (Size: {len(batch)})")
 
-        # --- Loop #3 (as list comprehension): Filters users within the current batch ---
-        filtered_users = [user for user in batch if user.get("age", 0) > 25]
+        if columnar:
+            # Vectorized filter: one mask over the age column
+            filtered_users = list(batch.take(batch.age_above(25)).rows())
+        else:
+            # --- Loop #3 (as list comprehension): Filters users within the current batch ---
+            filtered_users = [user for user in batch if user.get("age", 0) > 25]
 
         print(f"Found {len(filtered_users)} users over the age of 25 in this batch:")
         if not filtered_users:
@@ -88,6 +241,142 @@ def batch_processing(batch_size: int):
     print("\n--- Batch Processing Complete ---")
 
 
+def count_users():
+    """
+    Counts the rows in user_data, used to estimate the remaining time.
+
+    Returns:
+        int: The row count, or None if it could not be read.
+    """
+    connection = None
+    try:
+        connection = backend.connect()
+        cursor = backend.cursor(connection)
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        (total,) = cursor.fetchone()
+        cursor.close()
+        return total
+    except backend.Error as err:
+        print(f"Database error: {err}")
+        return None
+    finally:
+        if connection and backend.is_connected(connection):
+            connection.close()
+
+
+def load_checkpoint(path):
+    """
+    Reads the state saved by a previous run.
+
+    Args:
+        path (str): The checkpoint file.
+
+    Returns:
+        dict: The saved state, or None if there is no checkpoint.
+    """
+    try:
+        with open(path, encoding="utf-8") as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    """
+    Writes the job state atomically: the new state goes to a temporary file
+    that replaces the old one, so a crash mid-write never corrupts it.
+
+    Args:
+        path (str): The checkpoint file.
+        state (dict): The state to persist.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temp_path, path)
+
+
+def print_users_over_25(batch):
+    """The default batch step: reports the users over the age of 25."""
+    filtered_users = [user for user in batch if user.get("age", 0) > 25]
+    print(f"Found {len(filtered_users)} users over the age of 25 in this batch.")
+
+
+def resumable_batch_processing(
+    batch_size: int,
+    process_batch=print_users_over_25,
+    checkpoint_path: str = CHECKPOINT_FILE,
+    reset: bool = False,
+):
+    """
+    Processes user data in batches ordered by user_id and records the last
+    committed key after every batch. After a crash, running it again resumes
+    right after the last batch that completed.
+
+    A batch that was processed but not yet checkpointed when the job died is
+    processed again on restart, so process_batch must be idempotent. Database
+    errors propagate with the checkpoint left at the last completed batch;
+    the job is only marked completed once the table has been read to the end.
+
+    Args:
+        batch_size (int): The number of users per batch.
+        process_batch (callable): Called with each list of user dictionaries.
+        checkpoint_path (str): Where the job state is kept.
+        reset (bool): Ignore any existing checkpoint and start over.
+
+    Returns:
+        int: The total number of users processed by the job so far.
+    """
+    state = None if reset else load_checkpoint(checkpoint_path)
+    if state is None:
+        state = {"cursor": None, "processed": 0, "completed": False}
+    elif state.get("completed"):
+        print(f"Job already completed ({state['processed']} users). Use reset=True.")
+        return state["processed"]
+    else:
+        print(f"Resuming after {state['processed']} users from '{checkpoint_path}'.")
+
+    total = count_users()
+    run_start = time.perf_counter()
+    processed_this_run = 0
+
+    try:
+        pages = lazy_paginate_keyset(
+            batch_size, cursor=state["cursor"], raise_errors=True
+        )
+        for batch, next_cursor in pages:
+            process_batch(batch)
+
+            processed_this_run += len(batch)
+            state = {
+                "cursor": next_cursor,
+                "processed": state["processed"] + len(batch),
+                "completed": False,
+            }
+            save_checkpoint(checkpoint_path, state)
+
+            elapsed = time.perf_counter() - run_start
+            rate = processed_this_run / elapsed if elapsed else 0
+            progress = f"{state['processed']} users, {rate:,.0f} users/s"
+            if total and rate:
+                remaining = max(total - state["processed"], 0)
+                progress += f", ETA {remaining / rate:,.0f}s"
+            print(f"[Checkpoint] {progress}")
+    except backend.Error:
+        print(
+            f"Stopped by a database error after {state['processed']} users. "
+            "Run again to resume from the last checkpoint."
+        )
+        raise
+
+    state["completed"] = True
+    save_checkpoint(checkpoint_path, state)
+    print(f"\n--- Resumable Batch Processing Complete ({state['processed']} users) ---")
+    return state["processed"]
+
+
 def main():
     """Main function to run the batch processing demonstration."""
     # Define the batch size. Try changing this value (e.g., to 3, 5, or 10)
@@ -1,81 +1,331 @@
-import os
-from dotenv import load_dotenv
-import mysql.connector
-
-load_dotenv()
-
-# --- DATABASE CONFIGURATION ---
-DB_CONFIG = {
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "database": os.getenv("DB_NAME"),
+import base64
+import json
+from contextlib import contextmanager
+
+# --- DATABASE BACKEND ---
+# MySQL or SQLite, selected by DB_BACKEND (see backends.py)
+backend = __import__("backends").get_backend()
+
+# --- KEYSET ORDERINGS ---
+# Each ordering ends with the primary key so the sort is total and a cursor
+# always points at exactly one position in the table.
+KEYSET_ORDERINGS = {
+    "user_id": ("user_id",),
+    "name": ("name", "user_id"),
 }
 
 
-def paginate_users(page_size, offset):
+@contextmanager
+def page_cursor(connection=None, raise_errors=False):
     """
-    Fetches a single 'page' of users from the database.
+    Provides a prepared, dictionary-returning cursor that a paginator reuses
+    for every page, so the connection is set up and the page statement is
+    prepared only once per iteration. Without a connection argument one is
+    opened for the duration of the block; a caller-supplied connection
+    (e.g. one taken from a connection pool) is left open.
 
     Args:
-        page_size (int): The number of users to fetch (LIMIT).
-        offset (int): The number of users to skip (OFFSET).
+        connection: An existing backend connection to use, or None.
+        raise_errors (bool): Re-raise a failure to connect instead of
+                             reporting it and yielding None.
+
+    Yields:
+        A dictionary cursor, or None if connecting failed.
+    """
+    owns_connection = connection is None
+    db_cursor = None
+    try:
+        if owns_connection:
+            connection = backend.connect()
+        db_cursor = backend.cursor(connection, dictionary=True, prepared=True)
+    except backend.Error as err:
+        if raise_errors:
+            if owns_connection and connection and backend.is_connected(connection):
+                connection.close()
+            raise
+        print(f"Database error: {err}")
+
+    try:
+        yield db_cursor
+    finally:
+        if db_cursor is not None:
+            db_cursor.close()
+        if owns_connection and connection and backend.is_connected(connection):
+            connection.close()
+
+
+def fetch_page(query, params, db_cursor=None, raise_errors=False):
+    """
+    Runs a page query and returns all of its rows.
+
+    Args:
+        query (str): The SELECT statement.
+        params (tuple): The statement parameters.
+        db_cursor: A cursor from page_cursor() to reuse, or None to run the
+                   query on a connection of its own.
+        raise_errors (bool): Re-raise database errors instead of reporting
+                             them and returning an empty page.
 
     Returns:
-        list: A list of user data dictionaries for the requested page.
-              Returns an empty list if no more users are found.
+        list: A list of user data dictionaries.
+              Returns an empty list on error.
     """
+    if db_cursor is not None:
+        try:
+            db_cursor.execute(backend.sql(query), params)
+            return db_cursor.fetchall()
+        except backend.Error as err:
+            if raise_errors:
+                raise
+            print(f"Database error: {err}")
+            return []
+
     connection = None
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        cursor = connection.cursor(dictionary=True)
-
-        query = "SELECT * FROM user_data LIMIT %s OFFSET %s"
-        cursor.execute(query, (page_size, offset))
+        connection = backend.connect()
+        cursor = backend.cursor(connection, dictionary=True)
+        cursor.execute(backend.sql(query), params)
 
         users = cursor.fetchall()
         return users
 
-    except mysql.connector.Error as err:
+    except backend.Error as err:
+        if raise_errors:
+            raise
         print(f"Database error: {err}")
         return []  # Return an empty list on error
     finally:
-        if connection and connection.is_connected():
+        if connection and backend.is_connected(connection):
             connection.close()
 
 
-def lazy_paginate(page_size: int = 5):
+def paginate_users(page_size, offset, db_cursor=None):
+    """
+    Fetches a single 'page' of users from the database.
+
+    Args:
+        page_size (int): The number of users to fetch (LIMIT).
+        offset (int): The number of users to skip (OFFSET).
+        db_cursor: A cursor from page_cursor() to reuse, or None to open
+                   a connection just for this page.
+
+    Returns:
+        list: A list of user data dictionaries for the requested page.
+              Returns an empty list if no more users are found.
+    """
+    query = "SELECT * FROM user_data LIMIT %s OFFSET %s"
+    return fetch_page(query, (page_size, offset), db_cursor)
+
+
+def lazy_paginate(page_size: int = 5, connection=None):
     """
     A generator that lazily fetches pages of users from the database.
     It only fetches the next page when requested by the consumer.
 
+    One connection is held for the whole iteration and released when the
+    generator is exhausted, closed or garbage collected.
+
     Args:
         page_size (int): The number of users per page.
+        connection: A backend connection to use (e.g. from a pool) instead
+                    of opening one.
 
     Yields:
         list: A list of user dictionaries representing a single page of data.
     """
     offset = 0
 
-    # --- The One Loop: This will run until there are no more pages to fetch ---
-    while True:
-        print(
-            f"\n[Generator] Attempting to fetch a page of size {page_size} at offset {offset}..."
-        )
+    with page_cursor(connection) as db_cursor:
+        if db_cursor is None:
+            return
+
+        # --- The One Loop: This will run until there are no more pages to fetch ---
+        while True:
+            print(
+                f"\n[Generator] Attempting to fetch a page of size {page_size} at offset {offset}..."
+            )
+
+            # Call the helper function to get the next page of data
+            page_of_users = paginate_users(
+                page_size=page_size, offset=offset, db_cursor=db_cursor
+            )
+
+            # If the page is empty, there's no more data. Stop the generator.
+            if not page_of_users:
+                print("[Generator] No more users found. Stopping.")
+                break  # Exit the while loop, which ends the generator
+
+            # Yield the fetched page to the consumer and pause execution
+            yield page_of_users
+
+            # After yielding, update the offset for the *next* time we are called
+            offset += page_size
+
+
+def encode_cursor(order_by, last_row):
+    """
+    Packs the sort key of the last row on a page into an opaque cursor.
+
+    Args:
+        order_by (str): One of the KEYSET_ORDERINGS names.
+        last_row (dict): The last user dictionary of the page.
+
+    Returns:
+        str: A URL-safe token that can be passed back to resume paging.
+    """
+    columns = KEYSET_ORDERINGS[order_by]
+    payload = {"o": order_by, "k": [str(last_row[column]) for column in columns]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Unpacks a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The opaque token.
+
+    Returns:
+        tuple: (order_by, key) where key is the list of sort key values.
+
+    Raises:
+        ValueError: If the token is malformed or names an unknown ordering.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        order_by, key = payload["o"], payload["k"]
+    except (ValueError, KeyError, TypeError, AttributeError) as err:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from err
+
+    columns = KEYSET_ORDERINGS.get(order_by)
+    if columns is None or not isinstance(key, list) or len(key) != len(columns):
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}")
+    return order_by, key
+
+
+def keyset_page_query(page_size, order_by="user_id", after=None):
+    """
+    Builds the statement for the page of users that follows a given sort
+    key. Shared by the synchronous and asynchronous keyset paginators.
+
+    Args:
+        page_size (int): The number of users to fetch (LIMIT).
+        order_by (str): One of the KEYSET_ORDERINGS names.
+        after (list): The sort key of the last row already seen, or None
+                      to start from the beginning.
+
+    Returns:
+        tuple: (query, params) with %s placeholders.
+    """
+    columns = KEYSET_ORDERINGS[order_by]
+
+    if after is None:
+        where_clause, params = "", ()
+    elif len(columns) == 1:
+        where_clause, params = f"WHERE {columns[0]} > %s", (after[0],)
+    else:
+        # Expanded form of (name, user_id) > (%s, %s); MySQL uses the index
+        # for this reliably, which is not always true for row comparisons.
+        first, second = columns
+        where_clause = f"WHERE {first} > %s OR ({first} = %s AND {second} > %s)"
+        params = (after[0], after[0], after[1])
+
+    query = (
+        f"SELECT * FROM user_data {where_clause} "
+        f"ORDER BY {', '.join(columns)} LIMIT %s"
+    )
+    return query, params + (page_size,)
+
+
+def paginate_users_after(
+    page_size, order_by="user_id", after=None, db_cursor=None, raise_errors=False
+):
+    """
+    Fetches the page of users that follows a given sort key (keyset/seek
+    pagination). Unlike OFFSET, the database seeks straight to the key
+    through the index, so a deep page costs the same as the first one.
+
+    Args:
+        page_size (int): The number of users to fetch (LIMIT).
+        order_by (str): One of the KEYSET_ORDERINGS names.
+        after (list): The sort key of the last row already seen, or None
+                      to start from the beginning.
+        db_cursor: A cursor from page_cursor() to reuse, or None to open
+                   a connection just for this page.
+        raise_errors (bool): See fetch_page.
+
+    Returns:
+        list: A list of user data dictionaries for the requested page.
+              Returns an empty list if no more users are found.
+    """
+    query, params = keyset_page_query(page_size, order_by, after)
+    return fetch_page(query, params, db_cursor, raise_errors)
+
+
+def lazy_paginate_keyset(
+    page_size: int = 5,
+    order_by: str = "user_id",
+    cursor=None,
+    connection=None,
+    raise_errors: bool = False,
+):
+    """
+    A generator that lazily fetches pages of users using keyset pagination.
+    Every page comes with an opaque cursor; passing that cursor back in
+    resumes iteration right after the page it belongs to.
+
+    Args:
+        page_size (int): The number of users per page.
+        order_by (str): "user_id" or "name" (ordered by name, then user_id).
+        cursor (str): A cursor from a previous run, or None to start over.
+                      When given, its ordering takes precedence.
+        connection: A backend connection to use (e.g. from a pool) instead
+                    of opening one.
+        raise_errors (bool): Let database errors propagate instead of
+                             ending the iteration early, so callers can
+                             tell a failure from the end of the table.
+
+    Yields:
+        tuple: (page, next_cursor) where page is a list of user dictionaries.
+    """
+    if order_by not in KEYSET_ORDERINGS:
+        raise ValueError(f"Unsupported keyset ordering: {order_by!r}")
+
+    after = None
+    if cursor is not None:
+        order_by, after = decode_cursor(cursor)
+
+    with page_cursor(connection, raise_errors) as db_cursor:
+        if db_cursor is None:
+            return
+
+        while True:
+            print(
+                f"\n[Generator] Attempting to fetch a page of size {page_size} after key {after}..."
+            )
+
+            page_of_users = paginate_users_after(
+                page_size,
+                order_by=order_by,
+                after=after,
+                db_cursor=db_cursor,
+                raise_errors=raise_errors,
+            )
 
-        # Call the helper function to get the next page of data
-        page_of_users = paginate_users(page_size=page_size, offset=offset)
+            if not page_of_users:
+                print("[Generator] No more users found. Stopping.")
+                break
 
-        # If the page is empty, there's no more data. Stop the generator.
-        if not page_of_users:
-            print("[Generator] No more users found. Stopping.")
-            break  # Exit the while loop, which ends the generator
+            next_cursor = encode_cursor(order_by, page_of_users[-1])
+            yield page_of_users, next_cursor
 
-        # Yield the fetched page to the consumer and pause execution
-        yield page_of_users
+            # A short page is the last one; skip the empty round trip.
+            if len(page_of_users) < page_size:
+                print("[Generator] Reached the last page. Stopping.")
+                break
 
-        # After yielding, update the offset for the *next* time we are called
-        offset += page_size
+            _, after = decode_cursor(next_cursor)
 
 
 def main():
@@ -1,18 +1,18 @@
-import mysql.connector
-from decimal import Decimal
+import math
+from collections import Counter
 
-from dotenv import load_dotenv
-import os
+# --- DATABASE BACKEND ---
+# MySQL or SQLite, selected by DB_BACKEND (see backends.py)
+backend = __import__("backends").get_backend()
 
-load_dotenv()
+# Rows pulled per fetchmany() call by the streaming aggregation fallback
+AGE_CHUNK_SIZE = 10_000
 
-# --- DATABASE CONFIGURATION ---
-DB_CONFIG = {
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "database": os.getenv("DB_NAME"),
-}
+# Materialized aggregates maintained by seed.create_age_stats; the names
+# are derived from seed.TABLE_NAME there, so they are taken from seed
+seed = __import__("seed")
+AGE_STATS_TABLE = seed.AGE_STATS_TABLE
+AGE_HISTOGRAM_TABLE = seed.AGE_HISTOGRAM_TABLE
 
 
 def stream_user_ages():
@@ -25,11 +25,11 @@ def stream_user_ages():
     """
     connection = None
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = backend.connect()
         print("[Generator] Connection opened. Streaming user ages...")
 
         # Use a server-side cursor for memory-efficient streaming
-        cursor = connection.cursor(buffered=False)
+        cursor = backend.cursor(connection, streaming=True)
 
         query = "SELECT age FROM user_data"
         cursor.execute(query)
@@ -39,53 +39,350 @@ def stream_user_ages():
             # The row is a tuple, e.g., (Decimal('28.00'),). We yield the value.
             yield row[0]
 
-    except mysql.connector.Error as err:
+    except backend.Error as err:
         print(f"Database error: {err}")
     finally:
-        if connection and connection.is_connected():
+        if connection and backend.is_connected(connection):
             cursor.close()
             connection.close()
             print("[Generator] Stream finished. Connection closed.")
 
 
-def calculate_average_age():
+def stream_user_age_chunks(chunk_size: int = AGE_CHUNK_SIZE):
+    """
+    A generator that yields users' ages in lists of up to chunk_size floats.
+    Rows are pulled with fetchmany() and converted to floats by the server,
+    so no per-row Decimal objects are created.
+
+    Args:
+        chunk_size (int): The number of ages per chunk.
+
+    Yields:
+        list: A list of ages as floats.
+
+    Raises:
+        backend.Error: If the query fails, so that a failed stream is
+                       never mistaken for an empty table.
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = backend.connect()
+        cursor = backend.cursor(connection, streaming=True)
+
+        # Adding a DOUBLE literal makes the server send floats, not DECIMALs
+        cursor.execute("SELECT age + 0E0 FROM user_data")
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
+
+    except backend.Error as err:
+        print(f"Database error: {err}")
+        raise
+    finally:
+        if connection and backend.is_connected(connection):
+            if cursor is not None:
+                cursor.close()
+            connection.close()
+
+
+def as_float(value):
+    """Converts a DECIMAL (or any numeric) value to float, keeping None."""
+    return None if value is None else float(value)
+
+
+class AgeAccumulator:
+    """
+    Running state shared by both aggregation modes: count, sum, min and max,
+    plus a value histogram when percentiles are requested. The streaming mode
+    folds whole chunks in with C-level builtins; the pushdown mode fills the
+    same fields straight from SQL. Ages are always held as floats, so every
+    mode returns the same types.
     """
-    Calculates the average age of all users by consuming data from a generator,
-    ensuring memory efficiency.
+
+    def __init__(self, track_histogram=False):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.histogram = Counter() if track_histogram else None
+
+    def add_chunk(self, ages):
+        """Folds a list of ages into the running state."""
+        if not ages:
+            return
+        self.count += len(ages)
+        self.total += math.fsum(ages)
+        chunk_min, chunk_max = min(ages), max(ages)
+        if self.minimum is None or chunk_min < self.minimum:
+            self.minimum = chunk_min
+        if self.maximum is None or chunk_max > self.maximum:
+            self.maximum = chunk_max
+        if self.histogram is not None:
+            self.histogram.update(ages)
+
+    def percentile(self, fraction):
+        """
+        Returns the nearest-rank percentile from the histogram.
+
+        Args:
+            fraction (float): The percentile as a fraction, e.g. 0.95.
+        """
+        if not self.count:
+            return None
+        rank = max(math.ceil(fraction * self.count), 1)
+        seen = 0
+        for value in sorted(self.histogram):
+            seen += self.histogram[value]
+            if seen >= rank:
+                return value
+        return self.maximum
+
+
+def bucket_histogram(acc, bucket_width=10):
+    """
+    Rolls the accumulator's value histogram up into fixed-width buckets.
 
     Returns:
-        Decimal: The calculated average age.
+        dict: Bucket lower bound -> number of users, in ascending order.
     """
-    # Initialize state variables for the aggregation
-    total_age = Decimal(0)
-    user_count = 0
+    buckets = Counter()
+    for value, count in acc.histogram.items():
+        buckets[int(value // bucket_width) * bucket_width] += count
+    return dict(sorted(buckets.items()))
 
-    print("[Calculator] Starting to process ages from the stream...")
 
-    # Get the generator that streams ages
-    age_generator = stream_user_ages()
+# --- AGGREGATE REGISTRY ---
+# Maps aggregate names to functions of an AgeAccumulator. Percentiles are
+# requested as "p<number>" (e.g. "p50", "p99.9") and resolved on the fly.
+AGGREGATES = {
+    "count": lambda acc: acc.count,
+    "sum": lambda acc: acc.total,
+    "avg": lambda acc: acc.total / acc.count if acc.count else None,
+    "min": lambda acc: acc.minimum,
+    "max": lambda acc: acc.maximum,
+    "histogram": bucket_histogram,
+}
 
-    # --- Loop #2: Consumes ages from the generator one by one ---
-    for age in age_generator:
-        total_age += age
-        user_count += 1
-        # Optional: uncomment to see the step-by-step calculation
-        # print(f"[Calculator] Processed age: {age}. Current Sum: {total_age}, Count: {user_count}")
 
-    # Calculate the final average after the loop is done
-    if user_count > 0:
-        average = total_age / user_count
-    else:
-        average = Decimal(0)
+def register_aggregate(name, func):
+    """
+    Adds a custom aggregate computed from an AgeAccumulator.
+
+    Args:
+        name (str): The name used to request it.
+        func (callable): Takes an AgeAccumulator and returns the value.
+    """
+    AGGREGATES[name] = func
 
-    return average
+
+def parse_percentile(name):
+    """Returns the fraction for a "p<number>" aggregate name, else None."""
+    if not name.startswith("p"):
+        return None
+    try:
+        value = float(name[1:])
+    except ValueError:
+        return None
+    if not 0 <= value <= 100:
+        raise ValueError(f"Percentile out of range: {name!r}")
+    return value / 100
+
+
+def pushdown_accumulator(track_histogram):
+    """
+    Builds an AgeAccumulator by letting the database do the work: one
+    aggregate query, plus a GROUP BY histogram when percentiles are needed
+    (ages are DECIMAL(5, 2), so the histogram stays small).
+
+    Raises:
+        backend.Error: If the database cannot run the queries.
+    """
+    connection = backend.connect()
+    try:
+        cursor = backend.cursor(connection)
+        cursor.execute(
+            "SELECT COUNT(age), COALESCE(SUM(age), 0), MIN(age), MAX(age) "
+            "FROM user_data"
+        )
+        count, total, minimum, maximum = cursor.fetchone()
+        acc = AgeAccumulator(track_histogram)
+        acc.count, acc.total = int(count), float(total)
+        acc.minimum, acc.maximum = as_float(minimum), as_float(maximum)
+
+        if track_histogram:
+            cursor.execute("SELECT age, COUNT(*) FROM user_data GROUP BY age")
+            acc.histogram.update({float(age): int(n) for age, n in cursor})
+
+        cursor.close()
+        return acc
+    finally:
+        connection.close()
+
+
+def stats_accumulator(track_histogram):
+    """
+    Builds an AgeAccumulator from the materialized aggregates that triggers
+    keep current, without touching user_data: O(1) in the table size.
+
+    Raises:
+        backend.Error: If the stats tables do not exist.
+    """
+    connection = backend.connect()
+    try:
+        cursor = backend.cursor(connection)
+        cursor.execute(
+            "SELECT COALESCE(SUM(row_count), 0), COALESCE(SUM(age_sum), 0) "
+            f"FROM {AGE_STATS_TABLE}"
+        )
+        count, total = cursor.fetchone()
+        acc = AgeAccumulator(track_histogram)
+        acc.count, acc.total = int(count), float(total)
+
+        # Ages are the leading primary key column, so both are index lookups
+        cursor.execute(f"SELECT MIN(age), MAX(age) FROM {AGE_HISTOGRAM_TABLE}")
+        minimum, maximum = cursor.fetchone()
+        acc.minimum, acc.maximum = as_float(minimum), as_float(maximum)
+
+        if track_histogram:
+            cursor.execute(
+                f"SELECT age, SUM(row_count) FROM {AGE_HISTOGRAM_TABLE} GROUP BY age"
+            )
+            acc.histogram.update({float(age): int(n) for age, n in cursor})
+
+        cursor.close()
+        return acc
+    finally:
+        connection.close()
+
+
+def streaming_accumulator(track_histogram, chunk_size=AGE_CHUNK_SIZE):
+    """
+    Builds an AgeAccumulator by streaming the ages in chunks.
+
+    Raises:
+        backend.Error: If the ages cannot be streamed.
+    """
+    acc = AgeAccumulator(track_histogram)
+    for chunk in stream_user_age_chunks(chunk_size):
+        acc.add_chunk(chunk)
+    return acc
+
+
+def aggregate_ages(
+    aggregates=("avg",), pushdown: bool = True, use_stats: bool = True
+):
+    """
+    Computes several aggregates over all users' ages in a single pass.
+
+    Args:
+        aggregates (iterable): Names from AGGREGATES and/or "p<number>"
+                               percentiles, e.g. ("avg", "max", "p95").
+        pushdown (bool): Let the database compute the aggregates when it
+                         can; otherwise stream the ages into Python.
+        use_stats (bool): Read the materialized aggregates first, falling
+                          back to the other modes if they are missing.
+
+    Returns:
+        dict: The value of each requested aggregate, keyed by name. Counts
+              are ints and ages are floats whichever mode computed them.
+
+    Raises:
+        backend.Error: If every mode fails; an empty table is not an error.
+    """
+    percentiles = {}
+    for name in aggregates:
+        fraction = parse_percentile(name)
+        if fraction is not None:
+            percentiles[name] = fraction
+        elif name not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {name!r}")
+
+    track_histogram = bool(percentiles) or "histogram" in aggregates
+    acc = None
+    if use_stats:
+        try:
+            acc = stats_accumulator(track_histogram)
+        except backend.Error as err:
+            print(f"[Calculator] Stats unavailable ({err}). Computing from scratch.")
+    if acc is None and pushdown:
+        try:
+            acc = pushdown_accumulator(track_histogram)
+        except backend.Error as err:
+            print(f"[Calculator] Pushdown failed ({err}). Falling back to streaming.")
+    if acc is None:
+        acc = streaming_accumulator(track_histogram)
+
+    return {
+        name: acc.percentile(percentiles[name])
+        if name in percentiles
+        else AGGREGATES[name](acc)
+        for name in aggregates
+    }
+
+
+def check_age_stats():
+    """
+    Consistency check: recomputes the aggregates from user_data and compares
+    them with the materialized ones, printing any mismatch.
+
+    Returns:
+        bool: True if the materialized aggregates are consistent.
+    """
+    cached = stats_accumulator(track_histogram=True)
+    fresh = pushdown_accumulator(track_histogram=True)
+
+    consistent = True
+    for field in ("count", "total", "minimum", "maximum"):
+        cached_value, fresh_value = getattr(cached, field), getattr(fresh, field)
+        if cached_value != fresh_value:
+            consistent = False
+            print(f"[Check] {field}: cached {cached_value}, actual {fresh_value}")
+
+    # Compare counts per age, ignoring ages whose count is zero
+    cached_counts = {age: n for age, n in cached.histogram.items() if n}
+    if cached_counts != dict(fresh.histogram):
+        consistent = False
+        mismatched = set(cached_counts.items()) ^ set(fresh.histogram.items())
+        print(f"[Check] histogram differs for {len({a for a, _ in mismatched})} ages")
+
+    print(f"[Check] Age stats are {'consistent' if consistent else 'INCONSISTENT'}.")
+    return consistent
+
+
+def calculate_average_age(pushdown: bool = True, use_stats: bool = True):
+    """
+    Calculates the average age of all users from the materialized aggregates,
+    in the database, or by streaming the ages in chunks, ensuring memory
+    efficiency.
+
+    Args:
+        pushdown (bool): Let the database compute the average.
+        use_stats (bool): Use the materialized aggregates when available.
+
+    Returns:
+        float: The calculated average age (0.0 if there are no users).
+
+    Raises:
+        backend.Error: If the ages cannot be read at all.
+    """
+    print("[Calculator] Starting to compute the average age...")
+    average = aggregate_ages(("avg",), pushdown=pushdown, use_stats=use_stats)["avg"]
+    return average if average is not None else 0.0
 
 
 def main():
     """Main function to orchestrate the calculation and print the result."""
     print("--- Starting Memory-Efficient Average Age Calculation ---")
 
-    average_age = calculate_average_age()
+    try:
+        average_age = calculate_average_age()
+    except backend.Error as err:
+        print(f"\n--- Calculation Failed ---\nCould not read the ages: {err}")
+        return
 
     print("\n--- Calculation Complete ---")
     # Print the final result, formatted to two decimal places
@@ -0,0 +1,316 @@
+import asyncio
+import contextlib
+import os
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+from dotenv import load_dotenv
+
+load_dotenv()
+
+stream_users_module = __import__("0-stream_users")
+batch_processing_module = __import__("1-batch_processing")
+lazy_paginate_module = __import__("2-lazy_paginate")
+stream_ages_module = __import__("4-stream_ages")
+KEYSET_ORDERINGS = lazy_paginate_module.KEYSET_ORDERINGS
+encode_cursor = lazy_paginate_module.encode_cursor
+decode_cursor = lazy_paginate_module.decode_cursor
+keyset_page_query = lazy_paginate_module.keyset_page_query
+
+# --- DATABASE CONFIGURATION ---
+# Same settings as the synchronous generators, in aiomysql's spelling
+DB_CONFIG = {
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "db": os.getenv("DB_NAME"),
+}
+
+# Rows pulled per fetchmany() call when streaming row by row
+STREAM_ARRAYSIZE = 100
+
+
+@asynccontextmanager
+async def async_connection(connection=None):
+    """
+    Provides an aiomysql connection for one stream. A caller-supplied
+    connection (e.g. acquired from an aiomysql pool) is used as-is and left
+    open; otherwise one is opened and closed around the block.
+
+    Args:
+        connection (aiomysql.Connection): An existing connection, or None.
+
+    Yields:
+        aiomysql.Connection: The open connection.
+    """
+    if connection is not None:
+        yield connection
+        return
+
+    connection = await aiomysql.connect(**DB_CONFIG)
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+async def async_stream_users(arraysize: int = STREAM_ARRAYSIZE, connection=None):
+    """
+    The asyncio counterpart of stream_users: yields (name, email, age) rows
+    one at a time from a server-side cursor without blocking the event loop.
+
+    Args:
+        arraysize (int): Rows pulled per fetchmany() round trip.
+        connection (aiomysql.Connection): A connection to use, or None.
+
+    Yields:
+        tuple: A single (name, email, age) row.
+    """
+    try:
+        async with async_connection(connection) as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    "SELECT name, email, age FROM user_data ORDER BY name"
+                )
+                while True:
+                    rows = await cursor.fetchmany(arraysize)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+    except aiomysql.Error as err:
+        print(f"Database error: {err}")
+
+
+async def async_stream_users_in_batches(batch_size: int = 100, connection=None):
+    """
+    The asyncio counterpart of stream_users_in_batches.
+
+    Args:
+        batch_size (int): The number of rows to include in each batch.
+        connection (aiomysql.Connection): A connection to use, or None.
+
+    Yields:
+        list: A list of user data dictionaries.
+    """
+    try:
+        async with async_connection(connection) as conn:
+            async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+                await cursor.execute(
+                    "SELECT user_id, name, email, age FROM user_data ORDER BY name"
+                )
+                while True:
+                    batch = await cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    yield batch
+    except aiomysql.Error as err:
+        print(f"Database error: {err}")
+
+
+async def async_lazy_paginate(page_size: int = 5, connection=None):
+    """
+    The asyncio counterpart of lazy_paginate: OFFSET pages fetched one at a
+    time on a single connection held for the whole iteration.
+
+    Args:
+        page_size (int): The number of users per page.
+        connection (aiomysql.Connection): A connection to use, or None.
+
+    Yields:
+        list: A list of user dictionaries representing a single page of data.
+    """
+    offset = 0
+    try:
+        async with async_connection(connection) as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                while True:
+                    await cursor.execute(
+                        "SELECT * FROM user_data LIMIT %s OFFSET %s",
+                        (page_size, offset),
+                    )
+                    page = await cursor.fetchall()
+                    if not page:
+                        break
+                    yield list(page)
+                    offset += page_size
+    except aiomysql.Error as err:
+        print(f"Database error: {err}")
+
+
+async def async_lazy_paginate_keyset(
+    page_size: int = 5, order_by: str = "user_id", cursor=None, connection=None
+):
+    """
+    The asyncio counterpart of lazy_paginate_keyset. Cursors are
+    interchangeable between the synchronous and asynchronous paginators.
+
+    Args:
+        page_size (int): The number of users per page.
+        order_by (str): "user_id" or "name" (ordered by name, then user_id).
+        cursor (str): A cursor from a previous run, or None to start over.
+        connection (aiomysql.Connection): A connection to use, or None.
+
+    Yields:
+        tuple: (page, next_cursor) where page is a list of user dictionaries.
+    """
+    if order_by not in KEYSET_ORDERINGS:
+        raise ValueError(f"Unsupported keyset ordering: {order_by!r}")
+
+    after = None
+    if cursor is not None:
+        order_by, after = decode_cursor(cursor)
+
+    try:
+        async with async_connection(connection) as conn:
+            async with conn.cursor(aiomysql.DictCursor) as db_cursor:
+                while True:
+                    await db_cursor.execute(
+                        *keyset_page_query(page_size, order_by, after)
+                    )
+                    page = list(await db_cursor.fetchall())
+                    if not page:
+                        break
+
+                    next_cursor = encode_cursor(order_by, page[-1])
+                    yield page, next_cursor
+
+                    if len(page) < page_size:
+                        break
+                    _, after = decode_cursor(next_cursor)
+    except aiomysql.Error as err:
+        print(f"Database error: {err}")
+
+
+async def async_stream_user_ages(arraysize: int = STREAM_ARRAYSIZE, connection=None):
+    """
+    The asyncio counterpart of stream_user_ages.
+
+    Args:
+        arraysize (int): Rows pulled per fetchmany() round trip.
+        connection (aiomysql.Connection): A connection to use, or None.
+
+    Yields:
+        Decimal: The age of a single user.
+    """
+    try:
+        async with async_connection(connection) as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute("SELECT age FROM user_data")
+                while True:
+                    rows = await cursor.fetchmany(arraysize)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row[0]
+    except aiomysql.Error as err:
+        print(f"Database error: {err}")
+
+
+async def count_items(label, stream):
+    """Consumes an async stream and returns (label, item count)."""
+    count = 0
+    async for _ in stream:
+        count += 1
+    return label, count
+
+
+async def collect(stream):
+    """Consumes an async stream into a list."""
+    return [item async for item in stream]
+
+
+def sync_results(page_size):
+    """
+    Runs the synchronous generators against the same database, with their
+    progress prints silenced, for comparison with the async versions.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return {
+            "stream_users": list(stream_users_module.stream_users()),
+            "stream_users_in_batches": list(
+                batch_processing_module.stream_users_in_batches(page_size)
+            ),
+            "lazy_paginate_keyset": list(
+                lazy_paginate_module.lazy_paginate_keyset(page_size, order_by="name")
+            ),
+            "stream_user_ages": list(stream_ages_module.stream_user_ages()),
+        }
+
+
+async def check_against_sync(page_size: int = 100):
+    """
+    Checks the async streams against their synchronous counterparts on the
+    local database (run with DB_BACKEND=mysql so both read the same table).
+    Rows must match as multisets, batch sizes must match, and keyset pages
+    and cursors must match exactly since their ordering is total.
+
+    Returns:
+        bool: True if every stream returned the same data.
+    """
+    expected = await asyncio.to_thread(sync_results, page_size)
+    actual = dict(
+        zip(
+            expected,
+            await asyncio.gather(
+                collect(async_stream_users()),
+                collect(async_stream_users_in_batches(page_size)),
+                collect(async_lazy_paginate_keyset(page_size, order_by="name")),
+                collect(async_stream_user_ages()),
+            ),
+        )
+    )
+
+    def rows_key(row):
+        return tuple(sorted(row.items())) if isinstance(row, dict) else row
+
+    checks = {
+        "stream_users": sorted,
+        "stream_users_in_batches": lambda batches: (
+            [len(batch) for batch in batches],
+            sorted(rows_key(row) for batch in batches for row in batch),
+        ),
+        "lazy_paginate_keyset": lambda pages: [
+            ([rows_key(row) for row in page], cursor) for page, cursor in pages
+        ],
+        "stream_user_ages": sorted,
+    }
+    consistent = True
+    for name, normalize in checks.items():
+        matches = normalize(actual[name]) == normalize(expected[name])
+        consistent = consistent and matches
+        print(
+            f"  [Check] {name}: {len(actual[name])} items, "
+            f"{'matches' if matches else 'DIFFERS FROM'} the synchronous generator"
+        )
+    return consistent
+
+
+async def main():
+    """Runs all four async streams concurrently on one event loop."""
+    print("--- Starting Concurrent Async Streams ---")
+    start_time = time.perf_counter()
+
+    results = await asyncio.gather(
+        count_items("async_stream_users (rows)", async_stream_users()),
+        count_items(
+            "async_stream_users_in_batches (batches)",
+            async_stream_users_in_batches(100),
+        ),
+        count_items("async_lazy_paginate (pages)", async_lazy_paginate(100)),
+        count_items("async_stream_user_ages (ages)", async_stream_user_ages()),
+    )
+
+    for label, count in results:
+        print(f"  {label}: {count}")
+    elapsed = time.perf_counter() - start_time
+    print(f"\n--- All streams complete in {elapsed:.2f} seconds ---")
+
+    print("\n--- Checking the async streams against the synchronous ones ---")
+    await check_against_sync()
+
+
+if __name__ == "__main__":
+    # Requires aiomysql: pip install aiomysql
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+from decimal import Decimal
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- DATABASE CONFIGURATION ---
+DB_CONFIG = {
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "database": os.getenv("DB_NAME"),
+}
+# Which backend get_backend() returns: "mysql" (default) or "sqlite"
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+# The on-disk database file used by the SQLite backend
+SQLITE_PATH = os.getenv("SQLITE_PATH", "user_data.db")
+
+# SQLite cannot bind Decimal parameters (e.g. validated ages); store them as REAL
+sqlite3.register_adapter(Decimal, float)
+
+
+class MySQLBackend:
+    """
+    The production backend: mysql.connector with server-side (unbuffered)
+    cursors for streaming and server-side prepared statements.
+    """
+
+    name = "mysql"
+    insert_ignore = "INSERT IGNORE"
+
+    def __init__(self, config=None):
+        # Imported here so the SQLite backend works without the MySQL driver
+        import mysql.connector
+
+        self.driver = mysql.connector
+        self.Error = mysql.connector.Error
+        self.config = dict(config or DB_CONFIG)
+
+    def connect(self):
+        """Opens a connection to the configured database."""
+        return self.driver.connect(**self.config)
+
+    def cursor(self, connection, dictionary=False, streaming=False, prepared=False):
+        """
+        Creates a cursor.
+
+        Args:
+            connection: A connection from connect().
+            dictionary (bool): Return rows as dictionaries instead of tuples.
+            streaming (bool): Fetch rows from the server as they are read
+                              instead of buffering the whole result.
+            prepared (bool): Prepare statements once and reuse them.
+        """
+        if prepared:
+            return connection.cursor(prepared=True, dictionary=dictionary)
+        if streaming:
+            return connection.cursor(dictionary=dictionary, buffered=False)
+        return connection.cursor(dictionary=dictionary)
+
+    def sql(self, query):
+        """Adapts a query written with %s placeholders; MySQL uses them as-is."""
+        return query
+
+    def is_connected(self, connection):
+        """Tells whether a connection is still open."""
+        return connection.is_connected()
+
+    def user_table_ddl(self, table):
+        """Returns the statements that create the user table."""
+        # Note: UUIDs are stored as CHAR(36) in MySQL
+        return [
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "  `user_id` CHAR(36) NOT NULL PRIMARY KEY,"
+            "  `name` VARCHAR(255) NOT NULL,"
+            "  `email` VARCHAR(255) NOT NULL,"
+            "  `age` DECIMAL(5, 2) NOT NULL,"
+            "  UNIQUE INDEX `email_index` (`email`),"  # Lets the loader skip duplicates
+            "  INDEX `name_user_id_index` (`name`, `user_id`)"  # Keyset pagination
+            ") ENGINE=InnoDB"
+        ]
+
+
+def dict_row(cursor, row):
+    """sqlite3 row factory that returns rows as dictionaries."""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteBackend:
+    """
+    A local stand-in backed by an on-disk SQLite file, for tests and
+    benchmarks without a MySQL server. sqlite3 cursors always step through
+    results lazily and cache compiled statements, so the streaming and
+    prepared options need no special handling.
+    """
+
+    name = "sqlite"
+    insert_ignore = "INSERT OR IGNORE"
+    Error = sqlite3.Error
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+
+    def connect(self):
+        """Opens a connection to the database file."""
+        # Parallel loaders wait for the write lock instead of failing
+        return sqlite3.connect(self.path, timeout=30)
+
+    def cursor(self, connection, dictionary=False, streaming=False, prepared=False):
+        """Creates a cursor; see MySQLBackend.cursor for the options."""
+        cursor = connection.cursor()
+        if dictionary:
+            cursor.row_factory = dict_row
+        return cursor
+
+    def sql(self, query):
+        """Adapts a query written with %s placeholders to sqlite3's ? style."""
+        return query.replace("%s", "?")
+
+    def is_connected(self, connection):
+        """Tells whether a connection is still open."""
+        try:
+            connection.total_changes
+        except sqlite3.ProgrammingError:
+            return False
+        return True
+
+    def user_table_ddl(self, table):
+        """Returns the statements that create the user table."""
+        return [
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "  user_id TEXT NOT NULL PRIMARY KEY,"
+            "  name TEXT NOT NULL,"
+            "  email TEXT NOT NULL COLLATE NOCASE UNIQUE,"
+            "  age NUMERIC NOT NULL"
+            ")",
+            f"CREATE INDEX IF NOT EXISTS {table}_name_user_id_index "
+            f"ON {table} (name, user_id)",
+        ]
+
+
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+def get_backend(name=None):
+    """
+    Returns the backend selected by name or by the DB_BACKEND setting.
+
+    Args:
+        name (str): "mysql" or "sqlite"; defaults to DB_BACKEND.
+
+    Raises:
+        ValueError: If the name is not a known backend.
+    """
+    name = name or DB_BACKEND
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown database backend: {name!r}") from None
+    return backend_class()
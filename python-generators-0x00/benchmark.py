@@ -0,0 +1,451 @@
+import argparse
+import contextlib
+import csv
+import hashlib
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+stream_users = __import__("0-stream_users").stream_users
+ColumnarBatch = __import__("1-batch_processing").ColumnarBatch
+partitioned_scan = __import__("partitioned_scan").partitioned_scan
+seed = __import__("seed")
+lazy_paginate_module = __import__("2-lazy_paginate")
+
+backend = lazy_paginate_module.backend
+paginate_users = lazy_paginate_module.paginate_users
+paginate_users_after = lazy_paginate_module.paginate_users_after
+page_cursor = lazy_paginate_module.page_cursor
+
+
+def best_run(func, *args, repeat=3, **kwargs):
+    """
+    Runs a function several times and keeps the fastest wall time.
+
+    Args:
+        func (callable): The function to time.
+        repeat (int): How many times to run it.
+
+    Returns:
+        tuple: (best observed run time in seconds, result of the last run)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def best_time(func, *args, repeat=3, **kwargs):
+    """Runs a function several times and returns the fastest wall time."""
+    return best_run(func, *args, repeat=repeat, **kwargs)[0]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the progress prints of the generators while they are measured."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def key_at_depth(depth):
+    """
+    Looks up the user_id of the row just before a given depth, so the keyset
+    page at that depth can be fetched without walking all earlier pages.
+
+    Args:
+        depth (int): The number of rows to skip.
+
+    Returns:
+        list: The sort key to seek past, or None for depth 0.
+    """
+    if depth == 0:
+        return None
+    connection = backend.connect()
+    try:
+        cursor = backend.cursor(connection)
+        cursor.execute(
+            backend.sql(
+                "SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s"
+            ),
+            (depth - 1,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        return [row[0]] if row else None
+    finally:
+        connection.close()
+
+
+def benchmark_pagination(depths, page_size, repeat):
+    """
+    Compares OFFSET pagination with keyset pagination at several depths.
+
+    Args:
+        depths (list): Row offsets at which to fetch a page.
+        page_size (int): The number of users per page.
+        repeat (int): Runs per measurement; the best one is reported.
+    """
+    print(f"--- Pagination benchmark (page_size={page_size}, best of {repeat}) ---")
+    print(f"{'depth':>12} {'offset (ms)':>14} {'keyset (ms)':>14} {'speedup':>9}")
+
+    for depth in depths:
+        after = key_at_depth(depth)
+        if depth and after is None:
+            print(f"{depth:>12} {'(table has fewer rows, skipped)':>39}")
+            continue
+
+        offset_time = best_time(paginate_users, page_size, depth, repeat=repeat)
+        keyset_time = best_time(
+            paginate_users_after, page_size, after=after, repeat=repeat
+        )
+        speedup = offset_time / keyset_time if keyset_time else float("inf")
+        print(
+            f"{depth:>12} {offset_time * 1000:>14.2f} "
+            f"{keyset_time * 1000:>14.2f} {speedup:>8.1f}x"
+        )
+
+
+def walk_pages(pages, page_size, db_cursor=None):
+    """Fetches the first `pages` OFFSET pages, optionally on a shared cursor."""
+    for page_number in range(pages):
+        paginate_users(page_size, page_number * page_size, db_cursor=db_cursor)
+
+
+def benchmark_connection_reuse(pages, page_size, repeat):
+    """
+    Compares per-page latency when every page opens its own connection
+    against holding one connection and prepared statement for the walk.
+
+    Args:
+        pages (int): The number of consecutive pages to fetch.
+        page_size (int): The number of users per page.
+        repeat (int): Runs per measurement; the best one is reported.
+    """
+    print(
+        f"--- Connection reuse benchmark ({pages} pages of {page_size}, "
+        f"best of {repeat}) ---"
+    )
+    per_call_time = best_time(walk_pages, pages, page_size, repeat=repeat)
+
+    def walk_with_shared_cursor():
+        with page_cursor() as db_cursor:
+            walk_pages(pages, page_size, db_cursor=db_cursor)
+
+    reused_time = best_time(walk_with_shared_cursor, repeat=repeat)
+
+    print(f"{'connection per page':>24}: {per_call_time / pages * 1000:8.3f} ms/page")
+    print(f"{'shared connection':>24}: {reused_time / pages * 1000:8.3f} ms/page")
+
+
+def benchmark_stream_users(arraysizes, repeat):
+    """
+    Compares full-table streaming through stream_users with row-by-row
+    cursor iteration, fixed fetchmany() block sizes and auto-tuning.
+    Run it against a table of the size you care about (e.g. 1M rows).
+
+    Args:
+        arraysizes (list): Fixed block sizes to try.
+        repeat (int): Runs per measurement; the best one is reported.
+    """
+    print(f"--- stream_users benchmark (best of {repeat}) ---")
+    modes = [("row by row", {})]
+    modes += [(f"arraysize={size}", {"arraysize": size}) for size in arraysizes]
+    modes.append(("auto-tuned", {"auto_tune": True}))
+
+    for label, options in modes:
+        with quiet():
+            elapsed, row_count = best_run(
+                lambda: sum(1 for _ in stream_users(**options)), repeat=repeat
+            )
+        rate = row_count / elapsed if elapsed else 0
+        print(f"{label:>24}: {row_count} rows in {elapsed:8.3f}s ({rate:,.0f} rows/s)")
+
+
+def synthetic_users(count):
+    """
+    Yields (name, email, age) tuples shaped like the seed CSV. Emails are
+    deterministic, so seeding the same size twice inserts nothing new.
+    """
+    for i in range(count):
+        yield f"User Number {i}", f"user.{i}@example.com", 18 + i % 80
+
+
+def synthetic_rows(count):
+    """Builds (user_id, name, email, age) tuples shaped like user_data rows."""
+    return [(str(uuid.uuid4()), *user) for user in synthetic_users(count)]
+
+
+def measure_allocation(build):
+    """Returns (result, bytes still allocated by build()) using tracemalloc."""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = build()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def measure_peak(build):
+    """Returns (result, peak bytes allocated while build() ran) using tracemalloc."""
+    tracemalloc.start()
+    try:
+        result = build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def benchmark_columnar(batch_size, repeat):
+    """
+    Compares a list-of-dicts batch with a ColumnarBatch of the same rows:
+    memory held by the batch and time to filter users older than 25.
+    Runs on synthetic rows, so no database is needed. Each batch is built
+    from freshly created rows, as a cursor returns them, so the strings
+    count towards the batch that keeps them.
+
+    Args:
+        batch_size (int): The number of rows per batch.
+        repeat (int): Runs per measurement; the best one is reported.
+    """
+    print(f"--- Columnar batch benchmark ({batch_size} rows, best of {repeat}) ---")
+    columns = ("user_id", "name", "email", "age")
+
+    dict_batch, dict_bytes = measure_allocation(
+        lambda: [
+            dict(zip(columns, (user_id, name, email, Decimal(age))))
+            for user_id, name, email, age in synthetic_rows(batch_size)
+        ]
+    )
+    columnar_batch, columnar_bytes = measure_allocation(
+        lambda: ColumnarBatch.from_rows(
+            [
+                (user_id, name, email, float(age))
+                for user_id, name, email, age in synthetic_rows(batch_size)
+            ]
+        )
+    )
+
+    dict_filter = best_time(
+        lambda: [user for user in dict_batch if user.get("age", 0) > 25],
+        repeat=repeat,
+    )
+    columnar_filter = best_time(
+        lambda: columnar_batch.take(columnar_batch.age_above(25)), repeat=repeat
+    )
+
+    print(f"{'':>16} {'memory (KiB)':>14} {'filter (ms)':>14}")
+    print(
+        f"{'list of dicts':>16} {dict_bytes / 1024:>14.1f} "
+        f"{dict_filter * 1000:>14.3f}"
+    )
+    print(
+        f"{'columnar':>16} {columnar_bytes / 1024:>14.1f} "
+        f"{columnar_filter * 1000:>14.3f}"
+    )
+    # The text columns are already fixed-width bytes (about 75 of the 84
+    # bytes a synthetic row takes), so the memory ratio is bounded by the
+    # size of the text itself rather than by per-object overhead
+    print(
+        f"{'reduction':>16} {dict_bytes / columnar_bytes:>13.1f}x "
+        f"{dict_filter / columnar_filter:>13.1f}x"
+    )
+
+
+def hash_emails(rows):
+    """CPU-heavy partition step for the scaling benchmark: rounds of SHA-256."""
+    count = 0
+    for (email,) in rows:
+        digest = email.encode("utf-8")
+        for _ in range(200):
+            digest = hashlib.sha256(digest).digest()
+        count += 1
+    return count
+
+
+def benchmark_partitioned_scan(worker_counts, repeat):
+    """
+    Measures how a CPU-bound full-table pass scales with the number of
+    partitioned-scan workers.
+
+    Args:
+        worker_counts (list): Pool sizes to try; each uses as many partitions.
+        repeat (int): Runs per measurement; the best one is reported.
+    """
+    print(f"--- Partitioned scan benchmark (best of {repeat}) ---")
+    baseline = None
+    for workers in worker_counts:
+        elapsed, row_count = best_run(
+            partitioned_scan,
+            hash_emails,
+            partitions=workers,
+            columns=("email",),
+            combine=lambda a, b: a + b,
+            repeat=repeat,
+        )
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>8} workers: {row_count} rows in {elapsed:8.3f}s "
+            f"(speedup {baseline / elapsed:4.1f}x)"
+        )
+
+
+def write_synthetic_csv(path, rows):
+    """Writes a user_data-shaped CSV with `rows` rows, quoted like the seed file."""
+    with open(path, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile, quoting=csv.QUOTE_ALL)
+        writer.writerow(["name", "email", "age"])
+        writer.writerows(synthetic_users(rows))
+
+
+def read_with_dictreader(path):
+    """The original seed path: one dict per row from csv.DictReader."""
+    with open(path, mode="r", encoding="utf-8") as csvfile:
+        return sum(1 for _ in csv.DictReader(csvfile))
+
+
+def read_with_mmap(path):
+    """The memory-mapped path: compact tuples from seed.read_mmap_rows."""
+    return sum(1 for _ in seed.read_mmap_rows(path))
+
+
+def run_reader(reader, path):
+    """
+    Runs one CSV reader in the current (fresh) process.
+
+    Returns:
+        tuple: (rows read, seconds, peak RSS of the process in KiB)
+    """
+    start = time.perf_counter()
+    row_count = reader(path)
+    elapsed = time.perf_counter() - start
+    return row_count, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark_csv_readers(path, rows, repeat):
+    """
+    Compares CSV parsing throughput and peak RSS of the DictReader path and
+    the memory-mapped tuple reader. Each run happens in a fresh process so
+    peak RSS is not inherited from earlier runs.
+
+    Args:
+        path (str): The CSV to read, or None to generate a synthetic one.
+        rows (int): Rows in the synthetic CSV when no path is given.
+        repeat (int): Runs per measurement; the best one is reported.
+    """
+    temp_dir = None
+    if path is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(temp_dir.name, "user_data.csv")
+        write_synthetic_csv(path, rows)
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+
+    print(f"--- CSV reader benchmark ({size_mb:,.1f} MB, best of {repeat}) ---")
+    print(f"{'':>12} {'rows':>12} {'MB/s':>10} {'peak RSS (MiB)':>16}")
+    try:
+        readers = (("DictReader", read_with_dictreader), ("mmap", read_with_mmap))
+        for label, reader in readers:
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    runs.append(executor.submit(run_reader, reader, path).result())
+            row_count, elapsed, peak_kib = min(runs, key=lambda run: run[1])
+            print(
+                f"{label:>12} {row_count:>12} {size_mb / elapsed:>10.1f} "
+                f"{peak_kib / 1024:>16.1f}"
+            )
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+
+def main():
+    """Parses the command line and runs the requested benchmarks."""
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the python-generators-0x00 access patterns."
+    )
+    parser.add_argument(
+        "--depths",
+        type=int,
+        nargs="+",
+        default=[0, 1_000, 10_000, 100_000, 1_000_000],
+        help="Row offsets at which to fetch a page.",
+    )
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=200,
+        help="Pages walked by the connection reuse benchmark.",
+    )
+    parser.add_argument(
+        "--arraysizes",
+        type=int,
+        nargs="+",
+        default=[100, 1_000, 10_000],
+        help="fetchmany() block sizes tried by the stream benchmark.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100_000,
+        help="Rows per batch in the columnar benchmark.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Worker counts tried by the partitioned scan benchmark.",
+    )
+    parser.add_argument(
+        "--csv",
+        help="CSV read by the CSV reader benchmark (default: a synthetic file).",
+    )
+    parser.add_argument(
+        "--csv-rows",
+        type=int,
+        default=1_000_000,
+        help="Rows in the synthetic CSV when --csv is not given.",
+    )
+    parser.add_argument(
+        "--only",
+        choices=["pagination", "reuse", "stream", "columnar", "partitioned", "csv"],
+        nargs="+",
+        default=["pagination", "reuse", "stream", "columnar", "partitioned", "csv"],
+        help="Benchmarks to run.",
+    )
+    args = parser.parse_args()
+
+    if "pagination" in args.only:
+        benchmark_pagination(args.depths, args.page_size, args.repeat)
+        print()
+    if "reuse" in args.only:
+        benchmark_connection_reuse(args.pages, args.page_size, args.repeat)
+        print()
+    if "stream" in args.only:
+        benchmark_stream_users(args.arraysizes, args.repeat)
+        print()
+    if "columnar" in args.only:
+        benchmark_columnar(args.batch_size, args.repeat)
+        print()
+    if "partitioned" in args.only:
+        benchmark_partitioned_scan(args.workers, args.repeat)
+        print()
+    if "csv" in args.only:
+        benchmark_csv_readers(args.csv, args.csv_rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
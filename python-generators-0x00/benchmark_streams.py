@@ -0,0 +1,359 @@
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+
+benchmark = __import__("benchmark")
+stream_users_module = __import__("0-stream_users")
+batch_processing_module = __import__("1-batch_processing")
+lazy_paginate_module = __import__("2-lazy_paginate")
+stream_ages_module = __import__("4-stream_ages")
+seed = __import__("seed")
+
+backend = lazy_paginate_module.backend
+quiet = benchmark.quiet
+
+# Synthetic users are inserted in chunks of this many rows
+SEED_CHUNK_SIZE = 1_000
+
+# Metrics where a larger value is a regression, and where a smaller one is
+LOWER_IS_BETTER = ("peak_memory_bytes", "round_trips")
+HIGHER_IS_BETTER = ("rows_per_sec",)
+
+
+# --- ROUND TRIP COUNTING ---
+class CountingCursor:
+    """
+    Wraps a driver cursor and counts the calls that go to the database:
+    statements executed and fetches (each row read by iterating the cursor
+    counts as one fetch, like fetchone()).
+    """
+
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        self._counter.statements += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counter.statements += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def fetchone(self):
+        self._counter.fetches += 1
+        return self._cursor.fetchone()
+
+    def fetchmany(self, *args, **kwargs):
+        self._counter.fetches += 1
+        return self._cursor.fetchmany(*args, **kwargs)
+
+    def fetchall(self):
+        self._counter.fetches += 1
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._counter.fetches += 1
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class RoundTripCounter:
+    """
+    Counts connections, statements and fetches made through the backend
+    objects of the generator modules while it is active.
+
+    Every module holds its own backend instance, so each one is patched
+    for the duration of the `with` block and restored afterwards.
+    """
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.connections = self.statements = self.fetches = 0
+
+    @property
+    def round_trips(self):
+        return self.connections + self.statements + self.fetches
+
+    def __enter__(self):
+        for db in self.backends:
+            db.connect = self._counting_connect(db.connect)
+            db.cursor = self._counting_cursor(db.cursor)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for db in self.backends:
+            # Drop the instance attributes so the class methods show through
+            del db.connect, db.cursor
+
+    def _counting_connect(self, connect):
+        def wrapper():
+            self.connections += 1
+            return connect()
+
+        return wrapper
+
+    def _counting_cursor(self, cursor):
+        def wrapper(*args, **kwargs):
+            return CountingCursor(cursor(*args, **kwargs), self)
+
+        return wrapper
+
+
+# --- SYNTHETIC DATA ---
+def seed_synthetic_users(rows):
+    """
+    Creates user_data if needed and tops it up with `rows` synthetic users.
+
+    Args:
+        rows (int): The number of synthetic users the table should contain.
+
+    Returns:
+        int: The number of rows in user_data after seeding.
+    """
+    connection = backend.connect()
+    try:
+        with quiet():
+            seed.create_table(connection)
+            seed.bulk_insert_data(
+                connection,
+                seed.chunked(benchmark.synthetic_users(rows), SEED_CHUNK_SIZE),
+            )
+        cursor = backend.cursor(connection)
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        (total,) = cursor.fetchone()
+        cursor.close()
+        return total
+    finally:
+        connection.close()
+
+
+# --- ACCESS PATTERNS ---
+# Each pattern consumes one full pass and returns the number of rows it read
+def count_rows(stream):
+    return sum(1 for _ in stream)
+
+
+def count_batch_rows(batches):
+    return sum(len(batch) for batch in batches)
+
+
+def count_keyset_rows(pages):
+    return sum(len(page) for page, _ in pages)
+
+
+def access_patterns(args, table_rows):
+    """
+    Returns the benchmarked access patterns as (name, callable) pairs.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        table_rows (int): Rows in user_data, reported for the aggregate
+                          patterns that do not yield rows.
+    """
+    stream_users = stream_users_module.stream_users
+    stream_users_in_batches = batch_processing_module.stream_users_in_batches
+    lazy_paginate = lazy_paginate_module.lazy_paginate
+    lazy_paginate_keyset = lazy_paginate_module.lazy_paginate_keyset
+    calculate_average_age = stream_ages_module.calculate_average_age
+
+    def average_age(**options):
+        calculate_average_age(**options)
+        return table_rows
+
+    return [
+        ("stream_users", lambda: count_rows(stream_users())),
+        (
+            f"stream_users[arraysize={args.arraysize}]",
+            lambda: count_rows(stream_users(arraysize=args.arraysize)),
+        ),
+        ("stream_users[auto_tune]", lambda: count_rows(stream_users(auto_tune=True))),
+        (
+            f"stream_users_in_batches[{args.batch_size}]",
+            lambda: count_batch_rows(stream_users_in_batches(args.batch_size)),
+        ),
+        (
+            f"stream_users_in_batches[{args.batch_size},columnar]",
+            lambda: count_batch_rows(
+                stream_users_in_batches(args.batch_size, columnar=True)
+            ),
+        ),
+        (
+            f"lazy_paginate[{args.page_size}]",
+            lambda: count_batch_rows(lazy_paginate(args.page_size)),
+        ),
+        (
+            f"lazy_paginate_keyset[{args.page_size}]",
+            lambda: count_keyset_rows(lazy_paginate_keyset(args.page_size)),
+        ),
+        (
+            "calculate_average_age[pushdown]",
+            lambda: average_age(use_stats=False),
+        ),
+        (
+            "calculate_average_age[stream]",
+            lambda: average_age(pushdown=False, use_stats=False),
+        ),
+    ]
+
+
+def measure(pattern, repeat):
+    """
+    Benchmarks one access pattern.
+
+    Timing runs are kept free of instrumentation; one extra run under
+    tracemalloc and the round trip counter provides the other metrics.
+
+    Args:
+        pattern (callable): Runs one full pass and returns the rows read.
+        repeat (int): Timing runs; the fastest one is reported.
+
+    Returns:
+        dict: rows, seconds, rows_per_sec, peak_memory_bytes, round_trips
+              and its breakdown.
+    """
+    with quiet():
+        seconds, rows = benchmark.best_run(pattern, repeat=repeat)
+
+    counter = RoundTripCounter(
+        [
+            stream_users_module.backend,
+            batch_processing_module.backend,
+            lazy_paginate_module.backend,
+            stream_ages_module.backend,
+        ]
+    )
+    with quiet(), counter:
+        _, peak = benchmark.measure_peak(pattern)
+
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        "peak_memory_bytes": peak,
+        "round_trips": counter.round_trips,
+        "connections": counter.connections,
+        "statements": counter.statements,
+        "fetches": counter.fetches,
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    Lists the metrics that got worse than the baseline by more than
+    `tolerance` (a fraction, e.g. 0.2 for 20%).
+
+    Returns:
+        list: One human-readable line per regression.
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    f"{name}: {metric} {old} -> {new} ({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def main():
+    """Seeds the table, benchmarks every access pattern and writes JSON."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmarks the python-generators-0x00 streaming functions against "
+            "a synthetic user_data table and reports the results as JSON. "
+            "Point DB_BACKEND/SQLITE_PATH (or DB_NAME) at a scratch database."
+        )
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=10_000,
+        help="Synthetic users to seed before measuring.",
+    )
+    parser.add_argument(
+        "--no-seed",
+        action="store_true",
+        help="Measure the table as it is, without seeding.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--arraysize", type=int, default=1_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--page-size", type=int, default=1_000)
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        help="Run only the patterns whose name starts with one of these.",
+    )
+    parser.add_argument("--output", help="Write the JSON here instead of stdout.")
+    parser.add_argument(
+        "--baseline",
+        help="A previous JSON report; exit with status 1 on regressions.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown or growth against the baseline (default 0.2).",
+    )
+    args = parser.parse_args()
+
+    if args.no_seed:
+        connection = backend.connect()
+        cursor = backend.cursor(connection)
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        (table_rows,) = cursor.fetchone()
+        cursor.close()
+        connection.close()
+    else:
+        table_rows = seed_synthetic_users(args.rows)
+
+    results = {}
+    for name, pattern in access_patterns(args, table_rows):
+        if args.only and not name.startswith(tuple(args.only)):
+            continue
+        print(f"Measuring {name}...", file=sys.stderr)
+        results[name] = measure(pattern, args.repeat)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "backend": backend.name,
+        "python": platform.python_version(),
+        "table_rows": table_rows,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as report_file:
+            report_file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"[Regression] {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
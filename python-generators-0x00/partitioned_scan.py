@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+# --- DATABASE BACKEND ---
+# MySQL or SQLite, selected by DB_BACKEND (see backends.py)
+backend = __import__("backends").get_backend()
+
+# Rows pulled per fetchmany() call inside each partition
+PARTITION_ARRAYSIZE = 1_000
+
+# user_id values are random (version 4) UUIDs, so their first 8 hex digits
+# are spread evenly over this space and make balanced range boundaries
+_KEY_SPACE = 16**8
+
+
+def key_ranges(partitions: int):
+    """
+    Splits the user_id key space into contiguous ranges.
+
+    Args:
+        partitions (int): The number of ranges.
+
+    Returns:
+        list: (low, high) pairs of user_id prefixes. low is inclusive, high
+              is exclusive, and None means unbounded.
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+
+    boundaries = [
+        format(i * _KEY_SPACE // partitions, "08x") for i in range(1, partitions)
+    ]
+    lows = [None] + boundaries
+    highs = boundaries + [None]
+    return list(zip(lows, highs))
+
+
+def scan_partition(low, high, columns, arraysize: int = PARTITION_ARRAYSIZE):
+    """
+    A generator that streams the rows of one user_id range on its own
+    connection.
+
+    Args:
+        low (str): Inclusive lower bound, or None.
+        high (str): Exclusive upper bound, or None.
+        columns (tuple): The columns to select.
+        arraysize (int): Rows pulled per fetchmany() call.
+
+    Yields:
+        tuple: A single row.
+    """
+    conditions, params = [], []
+    if low is not None:
+        conditions.append("user_id >= %s")
+        params.append(low)
+    if high is not None:
+        conditions.append("user_id < %s")
+        params.append(high)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    connection = None
+    cursor = None
+    try:
+        connection = backend.connect()
+        cursor = backend.cursor(connection, streaming=True)
+        cursor.execute(
+            backend.sql(f"SELECT {', '.join(columns)} FROM user_data {where_clause}"),
+            params,
+        )
+        while True:
+            rows = cursor.fetchmany(arraysize)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        if connection and backend.is_connected(connection):
+            if cursor is not None:
+                cursor.close()
+            connection.close()
+
+
+def _run_partition(process_partition, low, high, columns):
+    """Worker entry point: feeds one partition's rows to process_partition."""
+    return process_partition(scan_partition(low, high, columns))
+
+
+def partitioned_scan(
+    process_partition,
+    partitions: int = 4,
+    workers: int = None,
+    columns=("user_id", "name", "email", "age"),
+    combine=None,
+):
+    """
+    Scans user_data as `partitions` key ranges, each streamed on its own
+    connection in a process pool, so CPU-heavy per-row work uses every core.
+
+    Args:
+        process_partition (callable): A module-level (picklable) function
+            that receives an iterator of row tuples for one partition and
+            returns that partition's result.
+        partitions (int): The number of key ranges.
+        workers (int): Pool size; defaults to `partitions`.
+        columns (tuple): The columns to select.
+        combine (callable): Optional two-argument function used to merge the
+            partition results into one value.
+
+    Returns:
+        The per-partition results in key order, or their merged value when
+        `combine` is given.
+    """
+    ranges = key_ranges(partitions)
+    with ProcessPoolExecutor(max_workers=workers or partitions) as executor:
+        futures = [
+            executor.submit(_run_partition, process_partition, low, high, columns)
+            for low, high in ranges
+        ]
+        results = [future.result() for future in futures]
+
+    if combine is None:
+        return results
+    return reduce(combine, results)
+
+
+def count_and_sum_ages(rows):
+    """Example partition step: returns (user count, total age)."""
+    count, total = 0, 0.0
+    for (age,) in rows:
+        count += 1
+        total += float(age)
+    return count, total
+
+
+def main():
+    """Computes the average age with a 4-way partitioned scan."""
+    print("--- Starting Partitioned Scan ---")
+    count, total = partitioned_scan(
+        count_and_sum_ages,
+        partitions=4,
+        columns=("age",),
+        combine=lambda a, b: (a[0] + b[0], a[1] + b[1]),
+    )
+    average = total / count if count else 0
+    print(f"Scanned {count} users. Average age: {average:.2f}")
+
+
+if __name__ == "__main__":
+    main()
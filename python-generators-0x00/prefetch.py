@@ -0,0 +1,85 @@
+import queue
+import threading
+
+# Markers passed through the queue alongside the items themselves
+_ITEM, _DONE, _ERROR = "item", "done", "error"
+
+# How often a blocked producer re-checks whether the consumer has gone away
+_POLL_SECONDS = 0.1
+
+
+def prefetch(source, depth: int = 2):
+    """
+    A generator that pulls items from another generator on a background
+    thread, keeping up to `depth` of them ready in a bounded queue. While the
+    consumer processes one batch or page, the next ones are already being
+    fetched from the database.
+
+    Works with any iterable, e.g. stream_users_in_batches() or lazy_paginate().
+
+    The queue bound is the backpressure: once `depth` items are waiting, the
+    producer blocks instead of reading ahead. If the consumer stops early
+    (break, close() or garbage collection), the producer is told to stop,
+    the source generator is closed on the producer thread so its finally
+    blocks release the connection there, and the thread is joined.
+
+    Args:
+        source (iterable): The generator to read ahead from.
+        depth (int): The maximum number of items fetched ahead.
+
+    Yields:
+        The items of `source`, in order. Exceptions raised by `source` are
+        re-raised in the consumer.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(message):
+        """Blocks until there is room, unless the consumer has stopped."""
+        while not stop.is_set():
+            try:
+                buffer.put(message, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                if not put((_ITEM, item)):
+                    return
+            put((_DONE, None))
+        except Exception as err:
+            put((_ERROR, err))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=produce, name="prefetch", daemon=True)
+    worker.start()
+
+    try:
+        while True:
+            kind, payload = buffer.get()
+            if kind == _ITEM:
+                yield payload
+            elif kind == _DONE:
+                return
+            else:
+                raise payload
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue, then wait for it to
+        # finish its current fetch and close the source
+        while True:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                break
+        worker.join()
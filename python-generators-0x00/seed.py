@@ -1,9 +1,22 @@
-import mysql.connector
-from mysql.connector import errorcode
-from mysql.connector.connection import MySQLConnection
+try:
+    import mysql.connector
+    from mysql.connector import errorcode
+    from mysql.connector.connection import MySQLConnection
+except ImportError:  # Only needed with the MySQL backend
+    mysql = errorcode = MySQLConnection = None
 import os
 import csv
+import glob
+import hashlib
+import io
+import math
+import mmap
+import re
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from decimal import Decimal, InvalidOperation
+from itertools import islice
 
 from dotenv import load_dotenv
 
@@ -16,7 +29,30 @@ DB_CONFIG = {
     'host': os.getenv('DB_HOST'),
 }
 DB_NAME = os.getenv('DB_NAME')
-TABLE_NAME = os.getenv('TABLE_NAME')
+TABLE_NAME = os.getenv('TABLE_NAME', 'user_data')
+
+# MySQL or SQLite, selected by DB_BACKEND (see backends.py)
+backend = __import__('backends').get_backend()
+
+# Rows sent per multi-row INSERT (and per commit) by the bulk loader
+INSERT_CHUNK_SIZE = int(os.getenv('INSERT_CHUNK_SIZE', 1000))
+# Number of parallel loaders used by main(); 1 keeps the single-connection path
+SEED_WORKERS = int(os.getenv('SEED_WORKERS', 1))
+# Bytes the memory-mapped reader decodes and parses at a time
+MMAP_BLOCK_SIZE = 1 << 20
+# Where rows that fail validation or are duplicates are written, with a reason
+REJECT_FILE = os.getenv('REJECT_FILE', 'user_data.rejects.csv')
+
+# Column limits of the user_data table
+MAX_TEXT_LENGTH = 255
+MAX_AGE = Decimal('999.99')  # DECIMAL(5, 2)
+# Incrementally maintained age aggregates (see create_age_stats)
+AGE_STATS_TABLE = f'{TABLE_NAME}_age_stats'
+AGE_HISTOGRAM_TABLE = f'{TABLE_NAME}_age_histogram'
+# Counters are striped over this many rows (by connection) so parallel
+# loaders do not all queue on one row lock
+STATS_SLOTS = 16
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
 
 def connect_db():
     """ Connects to the MySQL database server """
@@ -53,19 +89,16 @@ def create_database(connection: MySQLConnection):
         cursor.close()
 
 def connect_to_prodev():
-    """ Connects to the ALX_prodev database in MYSQL """
-    print(f"Attempting to connect to database '{DB_NAME}'...")
+    """ Connects to the ALX_prodev database in MYSQL (or the SQLite file) """
+    target = DB_NAME if backend.name == 'mysql' else backend.path
+    print(f"Attempting to connect to database '{target}'...")
     try:
-        # Add the database name to our config
-        db_specific_config = DB_CONFIG.copy()
-        db_specific_config['database'] = DB_NAME
-        
-        connection = mysql.connector.connect(**db_specific_config)
-        if connection.is_connected():
-            print(f"Successfully connected to database '{DB_NAME}'.")
+        connection = backend.connect()
+        if backend.is_connected(connection):
+            print(f"Successfully connected to database '{target}'.")
             return connection
     except Exception as e:
-        print(f"Failed to connect to '{DB_NAME}': {e}")
+        print(f"Failed to connect to '{target}': {e}")
         return None
     
 def create_table(connection: MySQLConnection):
@@ -75,92 +108,564 @@ def create_table(connection: MySQLConnection):
         return
         
     cursor = connection.cursor()
-    # Note: UUIDs are stored as CHAR(36) in MySQL
-    table_definition = (
-        f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} ("
-        "  `user_id` CHAR(36) NOT NULL PRIMARY KEY,"
-        "  `name` VARCHAR(255) NOT NULL,"
-        "  `email` VARCHAR(255) NOT NULL,"
-        "  `age` DECIMAL(5, 2) NOT NULL,"
-        "  INDEX `email_index` (`email`)" # Adding an index on email is good practice
-        ") ENGINE=InnoDB"
-    )
     try:
         print(f"Creating table '{TABLE_NAME}'...")
-        cursor.execute(table_definition)
+        # The table definition is dialect specific (see backends.py)
+        for statement in backend.user_table_ddl(TABLE_NAME):
+            cursor.execute(statement)
+        connection.commit()
         print(f"Table '{TABLE_NAME}' is ready.")
-    except mysql.connector.Error as err:
+        if backend.name == 'mysql':
+            ensure_unique_email(cursor)
+    except backend.Error as err:
         print(f"Failed to create table: {err}")
     finally:
         cursor.close()
 
-def insert_data(connection, data):
-    """ Inserts data into the database if it does not already exist """
+def ensure_unique_email(cursor):
+    """ Upgrades the email index of a table created before it was UNIQUE """
+    cursor.execute(
+        f"SHOW INDEX FROM {TABLE_NAME} WHERE Column_name = 'email' AND Non_unique = 0"
+    )
+    if cursor.fetchall():
+        return
+
+    print(f"Upgrading email index on '{TABLE_NAME}' to UNIQUE...")
+    # Fails (and is reported by the caller) if the table already holds duplicates
+    cursor.execute(
+        f"ALTER TABLE {TABLE_NAME} DROP INDEX `email_index`, "
+        "ADD UNIQUE INDEX `email_index` (`email`)"
+    )
+
+def create_age_stats(connection: MySQLConnection):
+    """
+    Creates the materialized age aggregates for the user table and the
+    triggers that keep them current on every INSERT, UPDATE and DELETE:
+    striped count/sum rows in AGE_STATS_TABLE and per-age counts in
+    AGE_HISTOGRAM_TABLE (whose primary key also gives MIN/MAX). Reading
+    them is O(1) regardless of table size. Existing rows are backfilled.
+    """
     if not connection:
-        print("Cannot insert data: No connection to database.")
+        print("Cannot create age stats: No connection to database.")
         return
-        
+    if backend.name != 'mysql':
+        print("Age stats triggers are only maintained on MySQL. Skipping.")
+        return
+
+    slot = f'CONNECTION_ID() % {STATS_SLOTS}'
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {AGE_STATS_TABLE} ("
+        "  `slot` TINYINT UNSIGNED NOT NULL PRIMARY KEY,"
+        "  `row_count` BIGINT NOT NULL,"
+        "  `age_sum` DECIMAL(20, 2) NOT NULL"
+        ") ENGINE=InnoDB",
+        f"CREATE TABLE IF NOT EXISTS {AGE_HISTOGRAM_TABLE} ("
+        "  `age` DECIMAL(5, 2) NOT NULL,"
+        "  `slot` TINYINT UNSIGNED NOT NULL,"
+        "  `row_count` BIGINT NOT NULL,"
+        "  PRIMARY KEY (`age`, `slot`)"
+        ") ENGINE=InnoDB",
+    ]
+
+    add_new = (
+        f"INSERT INTO {AGE_STATS_TABLE} (slot, row_count, age_sum) "
+        f"VALUES ({slot}, 1, NEW.age) "
+        "ON DUPLICATE KEY UPDATE row_count = row_count + 1, age_sum = age_sum + NEW.age; "
+        f"INSERT INTO {AGE_HISTOGRAM_TABLE} (age, slot, row_count) "
+        f"VALUES (NEW.age, {slot}, 1) "
+        "ON DUPLICATE KEY UPDATE row_count = row_count + 1;"
+    )
+    # Histogram counts never go negative: take the row from any slot that
+    # has one for this age, then drop the slot row once it reaches zero
+    remove_old = (
+        f"INSERT INTO {AGE_STATS_TABLE} (slot, row_count, age_sum) "
+        f"VALUES ({slot}, -1, -OLD.age) "
+        "ON DUPLICATE KEY UPDATE row_count = row_count - 1, age_sum = age_sum - OLD.age; "
+        f"UPDATE {AGE_HISTOGRAM_TABLE} SET row_count = row_count - 1 "
+        "WHERE age = OLD.age AND row_count > 0 ORDER BY slot LIMIT 1; "
+        f"DELETE FROM {AGE_HISTOGRAM_TABLE} WHERE age = OLD.age AND row_count = 0;"
+    )
+    triggers = {
+        'insert': ('AFTER INSERT', f"BEGIN {add_new} END"),
+        'delete': ('AFTER DELETE', f"BEGIN {remove_old} END"),
+        'update': (
+            'AFTER UPDATE',
+            f"BEGIN IF NOT (OLD.age <=> NEW.age) THEN {remove_old} {add_new} END IF; END",
+        ),
+    }
+    for action, (timing, body) in triggers.items():
+        name = f'{AGE_STATS_TABLE}_{action}'
+        statements.append(f"DROP TRIGGER IF EXISTS {name}")
+        statements.append(
+            f"CREATE TRIGGER {name} {timing} ON {TABLE_NAME} FOR EACH ROW {body}"
+        )
+
+    cursor = connection.cursor()
+    try:
+        for statement in statements:
+            cursor.execute(statement)
+        print(f"Age stats for '{TABLE_NAME}' are maintained by triggers.")
+    except backend.Error as err:
+        print(f"Failed to create age stats: {err}")
+        return
+    finally:
+        cursor.close()
+
+    rebuild_age_stats(connection)
+
+def rebuild_age_stats(connection: MySQLConnection):
+    """
+    Recomputes the materialized age aggregates from scratch in one
+    transaction. Run it while no other writes are in flight.
+    """
     cursor = connection.cursor()
-    insert_query = (
-        f"INSERT INTO {TABLE_NAME} (user_id, name, email, age) "
-        "VALUES (%s, %s, %s, %s)"
+    try:
+        connection.start_transaction()
+        cursor.execute(f"DELETE FROM {AGE_STATS_TABLE}")
+        cursor.execute(f"DELETE FROM {AGE_HISTOGRAM_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {AGE_STATS_TABLE} (slot, row_count, age_sum) "
+            f"SELECT 0, COUNT(*), COALESCE(SUM(age), 0) FROM {TABLE_NAME}"
+        )
+        cursor.execute(
+            f"INSERT INTO {AGE_HISTOGRAM_TABLE} (age, slot, row_count) "
+            f"SELECT age, 0, COUNT(*) FROM {TABLE_NAME} GROUP BY age"
+        )
+        connection.commit()
+        print(f"Age stats rebuilt from '{TABLE_NAME}'.")
+    except backend.Error as err:
+        connection.rollback()
+        print(f"Failed to rebuild age stats: {err}")
+    finally:
+        cursor.close()
+
+def read_csv_rows(path):
+    """ Streams a CSV file as (name, email, age) tuples """
+    with open(path, mode='r', encoding='utf-8', newline='') as csvfile:
+        csv_reader = csv.DictReader(csvfile)
+        for row in csv_reader:
+            yield (row['name'], row['email'], row['age'])
+
+def read_csv_in_chunks(path, chunk_size=INSERT_CHUNK_SIZE):
+    """ Streams a CSV file as lists of (name, email, age) tuples """
+    yield from chunked(read_csv_rows(path), chunk_size)
+
+def chunked(rows, chunk_size):
+    """ Groups any iterable of rows into lists of at most chunk_size """
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def bulk_insert_data(connection, chunks, label=''):
+    """
+    Inserts chunks of (name, email, age) rows with one multi-row INSERT per
+    chunk. Emails that already exist are skipped by the unique index, so the
+    load is idempotent and can simply be re-run after a failure.
+    An optional label prefixes progress lines (e.g. the worker name).
+    """
+    if not connection:
+        print("Cannot insert data: No connection to database.")
+        return 0
+
+    cursor = connection.cursor()
+    inserted = seen = 0
+    start = time.perf_counter()
+
+    try:
+        for chunk in chunks:
+            placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(chunk))
+            # IGNORE skips rows whose email is already present; unlike a no-op
+            # ON DUPLICATE KEY UPDATE, skipped rows are left out of rowcount
+            insert_query = (
+                f"{backend.insert_ignore} INTO {TABLE_NAME} (user_id, name, email, age) "
+                f"VALUES {placeholders}"
+            )
+            params = []
+            for name, email, age in chunk:
+                params.extend((str(uuid.uuid4()), name, email, age))
+
+            try:
+                cursor.execute(backend.sql(insert_query), params)
+                connection.commit()
+            except backend.Error as err:
+                connection.rollback()
+                print(f"Failed to insert chunk starting at row {seen + 1}: {err}")
+                seen += len(chunk)
+                continue
+
+            inserted += cursor.rowcount
+            seen += len(chunk)
+            elapsed = time.perf_counter() - start
+            print(f"  {label}{seen} rows read, {inserted} inserted ({seen / elapsed:,.0f} rows/s)")
+    finally:
+        cursor.close()
+
+    elapsed = time.perf_counter() - start
+    rate = seen / elapsed if elapsed else 0
+    print(
+        f"{label}Data insertion process complete: {inserted} inserted, "
+        f"{seen - inserted} skipped in {elapsed:.2f}s ({rate:,.0f} rows/s)."
     )
-    
-    for row in data:
-        try:
-            # Check if user with that email already exists to avoid duplicates
-            cursor.execute(f"SELECT user_id FROM {TABLE_NAME} WHERE email = %s", (row['email'],))
-            if cursor.fetchone():
-                print(f"Skipping existing user: {row['email']}")
+    return inserted
+
+def insert_data(connection, data):
+    """ Inserts data into the database if it does not already exist """
+    rows = ((row['name'], row['email'], row['age']) for row in data)
+    return bulk_insert_data(connection, chunked(rows, INSERT_CHUNK_SIZE))
+
+class EmailDeduper:
+    """
+    Remembers the emails seen so far as 64-bit BLAKE2 digests, a fraction
+    of the memory of the strings themselves. Emails are compared
+    case-insensitively, like the unique index under MySQL's default
+    collation.
+    """
+
+    def __init__(self):
+        self._seen = set()
+
+    def add(self, email):
+        """ Records an email; returns True if it had already been seen """
+        key = int.from_bytes(
+            hashlib.blake2b(email.lower().encode('utf-8'), digest_size=8).digest(), 'big'
+        )
+        if key in self._seen:
+            return True
+        self._seen.add(key)
+        return False
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter for imports too large for EmailDeduper. It may
+    report an unseen email as seen (at roughly error_rate), so such rows are
+    rejected as "probable duplicate" rather than dropped silently.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, email):
+        """ Records an email; returns True if it had (probably) been seen """
+        digest = hashlib.blake2b(email.lower().encode('utf-8'), digest_size=16).digest()
+        # Double hashing: derive every bit position from two 64-bit halves
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        seen = True
+        for i in range(self.hash_count):
+            position = (first + i * second) % self.size
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & mask:
+                seen = False
+                self.bits[byte] |= mask
+        return seen
+
+def validate_row(name, email, age):
+    """
+    Checks and coerces one CSV row to the user_data column types.
+    Returns (clean_row, None) or (None, reason).
+    """
+    name = (name or '').strip()
+    email = (email or '').strip()
+    if not name:
+        return None, 'missing name'
+    if len(name) > MAX_TEXT_LENGTH:
+        return None, 'name too long'
+    if len(email) > MAX_TEXT_LENGTH or not EMAIL_PATTERN.match(email):
+        return None, 'invalid email'
+    try:
+        age = Decimal((age or '').strip())
+    except InvalidOperation:
+        return None, 'invalid age'
+    if not age.is_finite():
+        return None, 'invalid age'
+    # Range-check before quantize(), which raises on values too large for
+    # the context precision (e.g. '1e30'), and again after rounding
+    if not 0 <= age <= MAX_AGE:
+        return None, 'age out of range'
+    age = age.quantize(Decimal('0.01'))
+    if age > MAX_AGE:
+        return None, 'age out of range'
+    return (name, email, age), None
+
+def clean_rows(rows, reject_path=REJECT_FILE, bloom_capacity=None, label=''):
+    """
+    Streaming pre-processing stage between the CSV reader and the loader:
+    validates and coerces each (name, email, age) row, drops emails already
+    seen in this import and writes every rejected row to reject_path with
+    the reason. A reject file left by an earlier run is removed first.
+    Pass bloom_capacity (expected row count) to dedupe with a Bloom filter
+    instead of the exact digest set.
+    """
+    if os.path.exists(reject_path):
+        os.remove(reject_path)
+    deduper = BloomFilter(bloom_capacity) if bloom_capacity else EmailDeduper()
+    duplicate_reason = 'probable duplicate email' if bloom_capacity else 'duplicate email'
+    accepted = rejected = 0
+    reject_file = reject_writer = None
+
+    try:
+        for row in rows:
+            clean_row, reason = validate_row(*row)
+            if clean_row and deduper.add(clean_row[1]):
+                clean_row, reason = None, duplicate_reason
+            if clean_row:
+                accepted += 1
+                yield clean_row
                 continue
 
-            # Generate a new UUID for the primary key
-            user_id = str(uuid.uuid4())
-            
-            # Prepare data for insertion
-            user_data = (user_id, row['name'], row['email'], row['age'])
-            
-            # Execute the insert query
-            cursor.execute(insert_query, user_data)
-            print(f"Inserted user: {row['name']}")
-            
-        except mysql.connector.Error as err:
-            print(f"Failed to insert data for {row.get('name', 'N/A')}: {err}")
-            
-    # Commit the changes to the database
-    connection.commit()
-    print("Data insertion process complete.")
-    cursor.close()
+            rejected += 1
+            if reject_writer is None:
+                # Only create the reject file once there is something to put in it
+                reject_file = open(reject_path, mode='w', encoding='utf-8', newline='')
+                reject_writer = csv.writer(reject_file)
+                reject_writer.writerow(['name', 'email', 'age', 'reason'])
+            reject_writer.writerow([*row, reason])
+    finally:
+        if reject_file:
+            reject_file.close()
+        print(f"{label}Validation: {accepted} rows accepted, {rejected} rejected.")
+        if rejected:
+            print(f"{label}Rejected rows written to '{reject_path}'.")
+
+def count_quotes(mm, start, end):
+    """ Counts the double quotes in mm[start:end], one block at a time """
+    return sum(
+        mm[position:min(position + MMAP_BLOCK_SIZE, end)].count(b'"')
+        for position in range(start, end, MMAP_BLOCK_SIZE)
+    )
+
+def next_row_start(mm, row_start, position, end):
+    """
+    Returns the offset of the first CSV row that starts at or after
+    position (or end), given that a row starts at row_start. A newline
+    only ends a row outside quotes, i.e. after an even number of double
+    quotes since row_start (an escaped "" adds two), so quoted fields may
+    contain newlines.
+    """
+    quotes = count_quotes(mm, row_start, position)
+    if position > row_start and mm[position - 1] == ord('\n') and quotes % 2 == 0:
+        return position
+    while position < end:
+        newline = mm.find(b'\n', position, end)
+        if newline == -1:
+            return end
+        quotes += count_quotes(mm, position, newline)
+        position = newline + 1
+        if quotes % 2 == 0:
+            return position
+    return end
+
+def compute_shards(path, workers):
+    """
+    Splits a CSV file into byte ranges, one per worker, aligned to row starts.
+    The file is memory-mapped and scanned for quotes, so a quoted field
+    containing a newline never straddles two shards. The header line is
+    excluded. Returns the header fields and a list of (start, end) offsets.
+    """
+    with open(path, mode='rb') as csvfile:
+        file_size = os.fstat(csvfile.fileno()).st_size
+        if file_size == 0:
+            return [], []
+
+        with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data_start = next_row_start(mm, 0, 0, file_size)
+            header = next(csv.reader([mm[:data_start].decode('utf-8')]))
+
+            boundaries = [data_start]
+            step = max((file_size - data_start) // workers, 1)
+            for i in range(1, workers):
+                position = max(data_start + i * step, boundaries[-1])
+                boundaries.append(next_row_start(mm, boundaries[-1], position, file_size))
+            boundaries.append(file_size)
+
+    shards = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+    return header, shards
+
+def read_shard_rows(path, header, start, end):
+    """
+    Streams the rows of one byte range as (name, email, age) tuples.
+    The range is read through a memory map in row-aligned blocks of about
+    MMAP_BLOCK_SIZE bytes, each decoded straight from the map into one
+    string and parsed in one pass by csv.reader, so no per-row dicts are
+    built and only one block is in memory at a time. Fields missing from
+    a short row come out as None, for validate_row to reject.
+    """
+    columns = [header.index(c) for c in ('name', 'email', 'age')]
+    name_col, email_col, age_col = columns
+    width = max(columns) + 1
+
+    with open(path, mode='rb') as csvfile, \
+            mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            memoryview(mm) as view:
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        position = start
+        released = start - start % mmap.PAGESIZE
+        while position < end:
+            # End the block at the first row start MMAP_BLOCK_SIZE bytes on or later
+            block_end = next_row_start(
+                mm, position, min(position + MMAP_BLOCK_SIZE, end), end
+            )
+
+            # Decoding the memoryview slice skips the intermediate bytes copy
+            block = str(view[position:block_end], 'utf-8')
+            for row in csv.reader(io.StringIO(block, newline='')):
+                if not row:
+                    continue
+                if len(row) < width:
+                    row += [None] * (width - len(row))
+                yield (row[name_col], row[email_col], row[age_col])
+            position = block_end
+
+            # Drop parsed pages from the mapping so RSS stays at about one block
+            if hasattr(mmap, 'MADV_DONTNEED'):
+                page_end = position - position % mmap.PAGESIZE
+                if page_end > released:
+                    mm.madvise(mmap.MADV_DONTNEED, released, page_end - released)
+                    released = page_end
+
+def read_mmap_rows(path):
+    """ Streams a whole CSV file as (name, email, age) tuples via read_shard_rows """
+    header, shards = compute_shards(path, 1)
+    for start, end in shards:
+        yield from read_shard_rows(path, header, start, end)
+
+def read_shard_in_chunks(path, header, start, end, chunk_size=INSERT_CHUNK_SIZE):
+    """ Streams the rows of one byte range as lists of (name, email, age) tuples """
+    yield from chunked(read_shard_rows(path, header, start, end), chunk_size)
+
+def shard_reject_path(shard_id):
+    """ The reject file one parallel worker writes, e.g. user_data.rejects.3.csv """
+    root, ext = os.path.splitext(REJECT_FILE)
+    return f'{root}.{shard_id}{ext}'
+
+def remove_shard_reject_files():
+    """ Removes the per-worker reject files of any earlier parallel run """
+    root, ext = os.path.splitext(REJECT_FILE)
+    for path in glob.glob(f'{glob.escape(root)}.*{glob.escape(ext)}'):
+        if path[len(root) + 1:len(path) - len(ext)].isdigit():
+            os.remove(path)
+
+def merge_reject_files(shard_count):
+    """
+    Concatenates the per-worker reject files into REJECT_FILE, keeping one
+    header, and removes them. Returns the number of rejected rows.
+    """
+    if os.path.exists(REJECT_FILE):
+        os.remove(REJECT_FILE)
+    rejected = 0
+    merged = None
+    try:
+        for shard_id in range(shard_count):
+            shard_path = shard_reject_path(shard_id)
+            if not os.path.exists(shard_path):
+                continue
+            with open(shard_path, mode='r', encoding='utf-8', newline='') as shard_file:
+                reader = csv.reader(shard_file)
+                header = next(reader, None)
+                if merged is None:
+                    merged = open(REJECT_FILE, mode='w', encoding='utf-8', newline='')
+                    writer = csv.writer(merged)
+                    writer.writerow(header)
+                for row in reader:
+                    writer.writerow(row)
+                    rejected += 1
+            os.remove(shard_path)
+    finally:
+        if merged:
+            merged.close()
+    return rejected
+
+def load_shard(path, header, shard_id, start, end):
+    """ Worker entry point: cleans and loads one shard on its own connection """
+    connection = connect_to_prodev()
+    if not connection:
+        return 0
+    try:
+        label = f'[worker {shard_id}] '
+        # Each worker dedupes its own shard; the unique index catches the rest
+        rows = clean_rows(
+            read_shard_rows(path, header, start, end),
+            reject_path=shard_reject_path(shard_id),
+            label=label,
+        )
+        return bulk_insert_data(connection, chunked(rows, INSERT_CHUNK_SIZE), label=label)
+    finally:
+        connection.close()
+
+def parallel_insert_data(path, workers=SEED_WORKERS, use_processes=True):
+    """
+    Loads a CSV file by splitting it into byte-range shards and inserting
+    them concurrently, each worker on its own connection from
+    connect_to_prodev(). Processes sidestep the GIL for CSV parsing; threads
+    are lighter when the database is the bottleneck. The workers' rejected
+    rows are merged into REJECT_FILE at the end.
+    """
+    header, shards = compute_shards(path, workers)
+    if not shards:
+        print(f"No rows to load in '{path}'.")
+        return 0
+    print(f"Loading '{path}' with {len(shards)} workers...")
+    remove_shard_reject_files()
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    inserted = 0
+    start = time.perf_counter()
+    with executor_class(max_workers=len(shards)) as executor:
+        futures = {
+            executor.submit(load_shard, path, header, shard_id, shard_start, shard_end): shard_id
+            for shard_id, (shard_start, shard_end) in enumerate(shards)
+        }
+        for future in as_completed(futures):
+            try:
+                inserted += future.result()
+            except Exception as e:
+                print(f"[worker {futures[future]}] failed: {e}")
+
+    elapsed = time.perf_counter() - start
+    print(f"Parallel load complete: {inserted} rows inserted in {elapsed:.2f}s.")
+    rejected = merge_reject_files(len(shards))
+    if rejected:
+        print(f"{rejected} rejected rows written to '{REJECT_FILE}'.")
+    return inserted
 
 def main():
     """Main function to orchestrate the database setup and seeding."""
-    # 1. Connect to the server and create the database
-    server_conn = connect_db()
-    if server_conn:
-        create_database(server_conn)
-        server_conn.close() # Close the general server connection
-        print("Server connection closed.")
-    else:
-        print("Could not establish server connection. Exiting.")
-        return
+    # 1. Connect to the server and create the database (SQLite creates the file itself)
+    if backend.name == 'mysql':
+        server_conn = connect_db()
+        if server_conn:
+            create_database(server_conn)
+            server_conn.close() # Close the general server connection
+            print("Server connection closed.")
+        else:
+            print("Could not establish server connection. Exiting.")
+            return
 
     # 2. Connect to the specific database and create the table/insert data
     prodev_conn = connect_to_prodev()
     if prodev_conn:
         create_table(prodev_conn)
+        create_age_stats(prodev_conn)
         
         # 3. Read data from CSV and insert
         try:
-            with open('user_data.csv', mode='r', encoding='utf-8') as csvfile:
-                # DictReader reads rows as dictionaries
-                csv_reader = csv.DictReader(csvfile)
-                data_to_insert = [row for row in csv_reader]
-                insert_data(prodev_conn, data_to_insert)
+            # Stream the file in chunks so it never has to fit in memory
+            if SEED_WORKERS > 1:
+                parallel_insert_data('user_data.csv', SEED_WORKERS)
+            else:
+                rows = clean_rows(read_mmap_rows('user_data.csv'))
+                bulk_insert_data(prodev_conn, chunked(rows, INSERT_CHUNK_SIZE))
         except FileNotFoundError:
             print("Error: user_data.csv not found in the current directory.")
             
         prodev_conn.close()
-        print(f"Connection to '{DB_NAME}' closed.")
+        print("Database connection closed.")
     else:
         print(f"Could not connect to database '{DB_NAME}'. Exiting.")
 